@@ -0,0 +1,325 @@
+"""Built-in UI page, served from memory when ui_static has no index.html."""
+
+INDEX_HTML = b'''<!DOCTYPE html>
+<html>
+<head>
+    <title>Stone Email & Image Processor</title>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            margin: 0;
+            padding: 20px;
+            background-color: #f4f4f4;
+        }
+        .container {
+            width: 80%;
+            margin: auto;
+            overflow: auto;
+            padding: 20px;
+            background: #fff;
+            border-radius: 5px;
+            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+        }
+        header {
+            background: #333;
+            color: white;
+            padding: 10px 20px;
+            text-align: center;
+            border-radius: 5px 5px 0 0;
+            margin-bottom: 20px;
+        }
+        h1, h2, h3 {
+            color: #333;
+        }
+        .card {
+            background: #f9f9f9;
+            padding: 15px;
+            margin-bottom: 15px;
+            border-left: 5px solid #333;
+        }
+        .warning {
+            background-color: #fff3cd;
+            border-left: 5px solid #ffc107;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+        }
+        table, th, td {
+            border: 1px solid #ddd;
+            padding: 8px;
+        }
+        th {
+            background-color: #f2f2f2;
+            text-align: left;
+        }
+        tr:nth-child(even) {
+            background-color: #f2f2f2;
+        }
+        .instructions {
+            background-color: #e7f3fe;
+            border-left: 6px solid #2196F3;
+            padding: 10px;
+            margin: 15px 0;
+        }
+        .query-section { margin-top: 20px; }
+        .query-section input[type="text"] { width: 70%; padding: 8px; }
+        .query-section button { padding: 8px 12px; }
+        .error { color: #d9534f; background-color: #f2dede; padding: 10px; border-radius: 4px; }
+        .success { color: #5cb85c; background-color: #dff0d8; padding: 10px; border-radius: 4px; }
+        pre { white-space: pre-wrap; overflow-x: auto; }
+        .results-table { margin-top: 15px; overflow-x: auto; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>Stone Email & Image Processor</h1>
+        </header>
+        
+        <div class="instructions">
+            <h3>How to Use This Tool</h3>
+            <p>To process files, place them in the input directory (default: <code>data</code> folder) and run the application.</p>
+            <p>Supported file types:</p>
+            <ul>
+                <li><strong>Emails:</strong> .mbox, .eml files</li>
+                <li><strong>Images:</strong> .jpg, .jpeg, .png files</li>
+                <li><strong>Documents:</strong> .pdf files</li>
+            </ul>
+            <p>You can specify a different input directory with the <code>--directory</code> or <code>-d</code> command-line option.</p>
+        </div>
+        
+        <div class="card">
+            <h2>Processing Summary</h2>
+            <div id="processing-summary">Loading...</div>
+        </div>
+        
+        <div id="unsupported-files-section" style="display: none;" class="card warning">
+            <h2>Unsupported Files</h2>
+            <div id="unsupported-files">Loading...</div>
+        </div>
+        
+        <div class="card">
+            <h2>Recent Processing Details</h2>
+            <div id="processing-details">Loading...</div>
+        </div>
+
+        <div id="query-section" class="query-section">
+            <h2>Run Query</h2>
+            <input type="text" id="query-input" placeholder="Enter SELECT query (e.g., SELECT * FROM emails LIMIT 10)">
+            <button onclick="runQuery()">Run Query</button>
+            <div id="query-results"></div>
+        </div>
+        
+        <div id="report-section" class="query-section">
+            <h2>Generate Report</h2>
+            <button onclick="generateReport()">Generate Report</button>
+            <div id="report-results"></div>
+        </div>
+    </div>
+    <script>
+        // Fetch processing metrics from the server
+        async function fetchMetrics() {
+            try {
+                const response = await fetch('/api/metrics');
+                const data = await response.json();
+                displayMetrics(data);
+            } catch (error) {
+                console.error('Error fetching metrics:', error);
+                document.getElementById('processing-summary').innerHTML = 
+                    '<p>Error loading metrics. Please try refreshing the page.</p>';
+            }
+        }
+        
+        // Summary rows shown when the corresponding metric is present
+        const SUMMARY_FIELDS = [
+            ['processed_emails', 'Processed Emails'],
+            ['processed_files', 'Processed Email Files'],
+            ['processed_images', 'Processed Images'],
+            ['image_files_found', 'Image Files Found'],
+            ['processed_pdfs', 'Processed PDFs'],
+            ['pdf_files_found', 'PDF Files Found'],
+        ];
+        
+        function displayMetrics(metrics) {
+            // Display summary
+            const rows = [];
+            
+            if (metrics.start_time) {
+                const startTime = new Date(metrics.start_time * 1000);
+                const elapsedTime = ((Date.now() / 1000) - metrics.start_time).toFixed(2);
+                rows.push(`<tr><td><strong>Processing Start Time</strong></td><td>${startTime.toLocaleString()}</td></tr>`);
+                rows.push(`<tr><td><strong>Total Processing Time</strong></td><td>${elapsedTime} seconds</td></tr>`);
+            }
+            
+            for (const [key, label] of SUMMARY_FIELDS) {
+                if (key in metrics) {
+                    rows.push(`<tr><td><strong>${label}</strong></td><td>${metrics[key]}</td></tr>`);
+                }
+            }
+            
+            document.getElementById('processing-summary').innerHTML = `<table>${rows.join('')}</table>`;
+            
+            // Display unsupported files if present
+            if (metrics.unsupported_files && metrics.unsupported_files.length > 0) {
+                document.getElementById('unsupported-files-section').style.display = 'block';
+                
+                // Group by extension
+                const byExt = metrics.unsupported_files.reduce((m, f) => {
+                    const k = f.extension || 'no extension';
+                    (m[k] ||= []).push(f);
+                    return m;
+                }, {});
+                
+                const extRows = Object.entries(byExt).map(([ext, files]) => {
+                    const examples = files.slice(0, 3).map(f => f.name).join(', ');
+                    const moreCount = files.length > 3 ? ` and ${files.length - 3} more` : '';
+                    return `<tr><td>${ext}</td><td>${files.length}</td><td>${examples}${moreCount}</td></tr>`;
+                });
+                
+                document.getElementById('unsupported-files').innerHTML =
+                    `<p>Found ${metrics.unsupported_files.length} files with unsupported file types:</p>` +
+                    `<table><tr><th>Extension</th><th>Count</th><th>Examples</th></tr>${extRows.join('')}</table>` +
+                    '<p>To process these files, support for these file types needs to be added to the application.</p>';
+            } else {
+                document.getElementById('unsupported-files-section').style.display = 'none';
+            }
+            
+            // Display additional details if available
+            let detailsHtml = '<p>No detailed information available.</p>';
+            document.getElementById('processing-details').innerHTML = detailsHtml;
+        }
+        
+        async function generateReport() {
+            try {
+                document.getElementById('report-results').innerHTML = '<p>Loading report data...</p>';
+                const response = await fetch('/api/report');
+                const report = await response.json();
+                
+                let reportHtml = '';
+                
+                if (report.status === 'error') {
+                    reportHtml = `<div class="error"><strong>Error:</strong> ${report.error}</div>`;
+                    if (report.traceback) {
+                        reportHtml += `<pre>${report.traceback}</pre>`;
+                    }
+                } else if (report.status === 'empty') {
+                    reportHtml = `<div class="error">
+                        <p>${report.message}</p>
+                        <p>${report.help || 'Add .mbox files to your data directory and run the processor.'}</p>
+                    </div>`;
+                } else {
+                    reportHtml = `<div class="success">
+                        <h3>Database Summary</h3>
+                        <table>
+                            <tr><td>Total Emails:</td><td>${report.emails_count}</td></tr>
+                            <tr><td>Total Threads:</td><td>${report.threads_count}</td></tr>
+                        </table>`;
+                        
+                    if (report.recent_emails && report.recent_emails.length > 0) {
+                        reportHtml += `<h3>Recent Emails</h3>
+                        <table>
+                            <tr><th>Date</th><th>Sender</th><th>Subject</th></tr>`;
+                        
+                        report.recent_emails.forEach(email => {
+                            reportHtml += `<tr>
+                                <td>${email.date}</td>
+                                <td>${email.sender}</td>
+                                <td>${email.subject}</td>
+                            </tr>`;
+                        });
+                        
+                        reportHtml += `</table>`;
+                    }
+                    
+                    reportHtml += `</div>`;
+                }
+                
+                document.getElementById('report-results').innerHTML = reportHtml;
+            } catch (error) {
+                document.getElementById('report-results').innerHTML = 
+                    `<div class="error">Error generating report: ${error.message}</div>`;
+            }
+        }
+        
+        async function runQuery() {
+            const q = document.getElementById('query-input').value.trim();
+            
+            if (!q) {
+                document.getElementById('query-results').innerHTML = 
+                    `<div class="error">Please enter a SQL query</div>`;
+                return;
+            }
+            
+            try {
+                document.getElementById('query-results').innerHTML = '<p>Executing query...</p>';
+                const response = await fetch('/api/query?q=' + encodeURIComponent(q));
+                const result = await response.json();
+                
+                if (result.error) {
+                    document.getElementById('query-results').innerHTML = 
+                        `<div class="error">Error: ${result.error}</div>`;
+                    return;
+                }
+                
+                if (result.info) {
+                    document.getElementById('query-results').innerHTML = 
+                        `<div class="info">${result.info}</div>`;
+                    return;
+                }
+                
+                // Display results as a table: one header row from result.columns,
+                // then one row per array in result.rows
+                const parts = ['<div class="results-table"><table><tr>'];
+                result.columns.forEach(col => parts.push(`<th>${col}</th>`));
+                parts.push('</tr>');
+                result.rows.forEach(row => {
+                    parts.push('<tr>' + row.map(value => `<td>${value !== null ? value : ''}</td>`).join('') + '</tr>');
+                });
+                parts.push('</table></div>');
+                
+                // Add note if present
+                if (result.note) {
+                    parts.push(`<p><em>${result.note}</em></p>`);
+                }
+                
+                const tableHtml = parts.join('');
+                document.getElementById('query-results').innerHTML = tableHtml;
+            } catch (error) {
+                document.getElementById('query-results').innerHTML = 
+                    `<div class="error">Error running query: ${error.message}</div>`;
+            }
+        }
+        
+        // Add example queries for easy use
+        function setExampleQuery(queryType) {
+            const queryInput = document.getElementById('query-input');
+            switch(queryType) {
+                case 'allEmails':
+                    queryInput.value = "SELECT * FROM emails LIMIT 10";
+                    break;
+                case 'emailCount':
+                    queryInput.value = "SELECT COUNT(*) AS email_count FROM emails";
+                    break;
+                case 'threadCount': 
+                    queryInput.value = "SELECT thread_id, COUNT(*) AS message_count FROM emails GROUP BY thread_id ORDER BY message_count DESC LIMIT 10";
+                    break;
+                case 'senders':
+                    queryInput.value = "SELECT sender, COUNT(*) AS email_count FROM emails GROUP BY sender ORDER BY email_count DESC LIMIT 10";
+                    break;
+                case 'dateRange':
+                    queryInput.value = "SELECT date, subject, sender FROM emails ORDER BY date DESC LIMIT 20";
+                    break;
+            }
+            runQuery();
+        }
+        
+        // Initial fetch
+        fetchMetrics();
+        
+        // Refresh every 5 seconds
+        setInterval(fetchMetrics, 5000);
+    </script>
+</body>
+</html>'''
@@ -49,6 +49,9 @@ def create_database(database_file: str) -> bool:
             conn.execute('CREATE INDEX IF NOT EXISTS idx_thread_id ON emails(thread_id)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_sender ON emails(sender)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_subject ON emails(subject)')
+            # Case-insensitive indexes for prefix searches, which match like LIKE 'term%'
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_subject_nocase ON emails(subject COLLATE NOCASE)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sender_nocase ON emails(sender COLLATE NOCASE)')
             
             # Create thread metadata table
             conn.execute('''
@@ -62,6 +65,34 @@ def create_database(database_file: str) -> bool:
                 )
             ''')
             
+            # Row counts kept current by triggers so reports avoid COUNT(*) scans.
+            # INSERT OR REPLACE does not fire delete triggers, so only count
+            # inserts whose message_id is not already present.
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS emails_stats (
+                    name TEXT PRIMARY KEY,
+                    cnt INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS emails_stats_insert
+                BEFORE INSERT ON emails
+                WHEN NOT EXISTS (SELECT 1 FROM emails WHERE message_id = NEW.message_id)
+                BEGIN
+                    UPDATE emails_stats SET cnt = cnt + 1 WHERE name = 'emails';
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS emails_stats_delete
+                AFTER DELETE ON emails
+                BEGIN
+                    UPDATE emails_stats SET cnt = cnt - 1 WHERE name = 'emails';
+                END
+            ''')
+            conn.execute("INSERT OR IGNORE INTO emails_stats (name, cnt) SELECT 'emails', COUNT(*) FROM emails")
+            
+            create_search_index(conn)
+            
             conn.commit()
             logger.info("Database schema created successfully")
             return True
@@ -72,6 +103,75 @@ def create_database(database_file: str) -> bool:
         logger.exception(f"Unexpected error creating database: {e}")
         raise DatabaseError(f"Error creating database: {e}") from e
 
+def create_search_index(conn: sqlite3.Connection) -> bool:
+    """
+    Creates the emails_fts full-text index over subject, content and sender.
+
+    The trigram tokenizer lets MATCH find arbitrary substrings of 3+ characters,
+    like LIKE '%term%'. Triggers keep the index in step with the emails table;
+    the first time it is created it is built from the existing rows.
+
+    Args:
+        conn: Open database connection
+
+    Returns:
+        True if the index exists, False if this SQLite build lacks FTS5 trigram support.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='emails_fts'").fetchone():
+        return True
+    
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE emails_fts USING fts5(
+                subject, content, sender,
+                content='emails', content_rowid='rowid', tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Full-text search unavailable, searches will use LIKE: {e}")
+        return False
+    
+    # External-content tables need the old values to remove an entry. INSERT OR
+    # REPLACE deletes the conflicting row without firing delete triggers, so
+    # that row is removed from the index before the insert instead.
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS emails_fts_replace
+        BEFORE INSERT ON emails
+        BEGIN
+            INSERT INTO emails_fts(emails_fts, rowid, subject, content, sender)
+            SELECT 'delete', rowid, subject, content, sender FROM emails WHERE message_id = NEW.message_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS emails_fts_insert
+        AFTER INSERT ON emails
+        BEGIN
+            INSERT INTO emails_fts(rowid, subject, content, sender)
+            VALUES (NEW.rowid, NEW.subject, NEW.content, NEW.sender);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS emails_fts_delete
+        AFTER DELETE ON emails
+        BEGIN
+            INSERT INTO emails_fts(emails_fts, rowid, subject, content, sender)
+            VALUES ('delete', OLD.rowid, OLD.subject, OLD.content, OLD.sender);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS emails_fts_update
+        AFTER UPDATE OF subject, content, sender ON emails
+        BEGIN
+            INSERT INTO emails_fts(emails_fts, rowid, subject, content, sender)
+            VALUES ('delete', OLD.rowid, OLD.subject, OLD.content, OLD.sender);
+            INSERT INTO emails_fts(rowid, subject, content, sender)
+            VALUES (NEW.rowid, NEW.subject, NEW.content, NEW.sender);
+        END
+    ''')
+    conn.execute("INSERT INTO emails_fts(emails_fts) VALUES ('rebuild')")
+    logger.info("Created full-text search index")
+    return True
+
 def insert_email_data(emails: List[Dict[str, Any]], database_file: str, batch_size: int = 500) -> int:
     """
     Inserts email data into the SQLite database with optimized batching.
@@ -17,7 +17,7 @@ try:
     from exceptions import EmailParsingError
     from database import insert_email_data, update_thread_info
     import config
-    from utils import get_file_hash, check_memory_usage
+    from utils import get_file_hash_cached, check_memory_usage
     
     # Try to import ThreadIdentifier, fallback to a simple implementation if not available
     try:
@@ -139,14 +139,14 @@ def process_mbox_files(directory: str, logger=None, dry_run: bool = False,
         # Skip unchanged files if requested
         if file_cache is not None:
             try:
-                current_hash = get_file_hash(mbox_file)
-                if mbox_file in file_cache and file_cache[mbox_file] == current_hash:
+                entry = file_cache.get(mbox_file)
+                previous_hash = entry["hash"] if isinstance(entry, dict) else entry
+                # Updates the cache with the current hash, skipping the re-hash if stat is unchanged
+                current_hash = get_file_hash_cached(mbox_file, file_cache)
+                if previous_hash == current_hash:
                     logger.info(f"Skipping unchanged file: {mbox_file}")
                     metrics["processed_files"] += 1  # Count as processed even if skipped
                     continue
-                else:
-                    # Update cache with current hash
-                    file_cache[mbox_file] = current_hash
             except Exception as e:
                 logger.warning(f"Error calculating file hash for {mbox_file}: {e}")
         
@@ -126,7 +126,7 @@ function runQuery() {
             return;
         }
         
-        if (data.length === 0) {
+        if (data.info || data.rows.length === 0) {
             resultsContainer.innerHTML = '<div class="alert alert-info">Query returned no results</div>';
             return;
         }
@@ -138,7 +138,7 @@ function runQuery() {
         // Create header row
         const thead = document.createElement('thead');
         const headerRow = document.createElement('tr');
-        Object.keys(data[0]).forEach(key => {
+        data.columns.forEach(key => {
             const th = document.createElement('th');
             th.textContent = key;
             headerRow.appendChild(th);
@@ -148,9 +148,9 @@ function runQuery() {
         
         // Create body rows
         const tbody = document.createElement('tbody');
-        data.forEach(row => {
+        data.rows.forEach(row => {
             const tr = document.createElement('tr');
-            Object.values(row).forEach(value => {
+            row.forEach(value => {
                 const td = document.createElement('td');
                 td.textContent = value;
                 tr.appendChild(td);
@@ -163,6 +163,12 @@ function runQuery() {
         resultsContainer.innerHTML = '';
         resultsContainer.appendChild(table);
         
+        if (data.note) {
+            const note = document.createElement('p');
+            note.innerHTML = `<em>${data.note}</em>`;
+            resultsContainer.appendChild(note);
+        }
+        
         // Add download options
         const downloadDiv = document.createElement('div');
         downloadDiv.className = 'mt-3';
@@ -171,7 +177,7 @@ function runQuery() {
                                 <button class="btn btn-sm btn-outline-secondary ms-2" onclick="downloadResults('json')">Download JSON</button>`;
         resultsContainer.appendChild(downloadDiv);
         
-        // Store results in a global variable for download
+        // Store results (columns + rows) in a global variable for download
         window.queryResults = data;
     })
     .catch(error => {
@@ -318,17 +324,18 @@ function downloadResults(format) {
         let content, filename, type;
         
         if (format === 'json') {
-            content = JSON.stringify(window.queryResults);
+            const { columns, rows } = window.queryResults;
+            content = JSON.stringify(rows.map(row => Object.fromEntries(columns.map((col, i) => [col, row[i]]))));
             filename = 'query_results.json';
             type = 'application/json';
         } 
         else if (format === 'csv') {
             // Convert to CSV
-            if (!window.queryResults.length) return;
+            if (!window.queryResults.rows.length) return;
             
-            const headers = Object.keys(window.queryResults[0]).join(',');
-            const rows = window.queryResults.map(row => {
-                return Object.values(row).map(value => {
+            const headers = window.queryResults.columns.join(',');
+            const rows = window.queryResults.rows.map(row => {
+                return row.map(value => {
                     return '"' + String(value).replace(/"/g, '""') + '"';
                 }).join(',');
             }).join('\n');
@@ -1,27 +1,206 @@
 import os
 import sys
 import logging
-import webbrowser
 import threading
 import json
 import time
+import copy
+import hashlib
+import re
+import csv
+import mmap
+import gzip
+import base64
 from pathlib import Path
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from socketserver import ThreadingMixIn
 import config
+from _index_html import INDEX_HTML
 import sqlite3
 import urllib.parse
-import pandas as pd
-from flask import jsonify, send_file, request
-import tempfile
-from datetime import datetime
+import queue
+from collections import OrderedDict
+from contextlib import closing, contextmanager, suppress
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def _json_default(obj):
+    """Encode BLOB cells, which JSON has no type for, as base64 text."""
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def _dumps(obj):
+    """Serialize obj to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(obj, default=_json_default).encode()
+
+# Pool of long-lived read connections shared by the API endpoints
+_POOL_SIZE = 8
+_pool = queue.Queue(maxsize=_POOL_SIZE)
+
+# Applied once per pooled connection. query_only makes SQLite itself reject any
+# write, so the API never modifies the database regardless of the SQL it is given.
+_CONN_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-131072;
+PRAGMA mmap_size=1073741824;
+PRAGMA query_only=1;
+"""
+
+def _new_conn():
+    """Open a database connection tuned for the UI's read workload."""
+    conn = sqlite3.connect(config.DATABASE_FILE, check_same_thread=False, isolation_level=None)
+    conn.executescript(_CONN_PRAGMAS)
+    return conn
+
+def _put_conn(conn):
+    """Return a connection to the pool, closing it if the pool is full."""
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+def close_pool():
+    """Close every idle pooled connection."""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            return
+        conn.close()
+
+@contextmanager
+def _get_conn():
+    """Borrow a pooled connection for the duration of a with-block."""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _new_conn()
+    try:
+        yield conn
+    finally:
+        _put_conn(conn)
+
+# Content types for static files, keyed by file suffix
+_CT = {
+    '.html': 'text/html',
+    '.css': 'text/css',
+    '.js': 'text/javascript',
+    '.json': 'application/json',
+    '.csv': 'text/csv',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Files served from memory when the UI directory does not provide its own copy
+_BUILTIN_FILES = {'/index.html': (INDEX_HTML, 'text/html')}
+
+# Content types worth precompressing for clients that accept it
+_COMPRESSIBLE_TYPES = {'text/html', 'text/css', 'text/javascript', 'application/json'}
+
+def _accepted_encodings(header):
+    """Return the set of content codings allowed by an Accept-Encoding header."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+# Status line and fixed headers shared by every 200 JSON response
+_JSON_HEADER = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+)
+
+# Serialized /api/metrics payload, shared by every polling client for one second
+_metrics_cache = {'second': None, 'body': None}
+_metrics_cache_lock = threading.Lock()
+
+def _cached_metrics_bytes(metrics):
+    """Return the JSON-encoded metrics, re-serializing at most once per second."""
+    second = int(time.time())
+    with _metrics_cache_lock:
+        if _metrics_cache['second'] != second:
+            _metrics_cache['body'] = _dumps(metrics)
+            _metrics_cache['second'] = second
+        return _metrics_cache['body']
 
 class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
     """Handle requests in a separate thread."""
     daemon_threads = True
 
+    def server_close(self):
+        """Close the listening socket and the pooled database connections."""
+        super().server_close()
+        close_pool()
+
+# Last report and the database state it was built from, reused for _REPORT_TTL seconds
+_REPORT_TTL = 2.0
+_report_cache = {'key': None, 'val': None, 'body': None, 'exp': 0}
+_report_cache_lock = threading.Lock()
+
+def _database_state():
+    """
+    Return (mtime_ns, size) of the database and of its WAL file, or None if
+    the database is missing. Every commit writes one of the two files, so
+    any change gives a new state; the WAL is also touched when the last
+    connection closes, which only costs a spurious cache miss.
+    """
+    try:
+        st = os.stat(config.DATABASE_FILE)
+    except OSError:
+        return None
+    try:
+        wal = os.stat(config.DATABASE_FILE + '-wal')
+        wal_state = (wal.st_mtime_ns, wal.st_size)
+    except OSError:
+        wal_state = None
+    return (st.st_mtime_ns, st.st_size, wal_state)
+
+def _cached_report():
+    """
+    Return the report and its JSON encoding, reusing the last pair while the
+    database files are unchanged and the cached copy is under _REPORT_TTL old.
+    """
+    key = _database_state()
+    now = time.monotonic()
+    with _report_cache_lock:
+        if key is not None and key == _report_cache['key'] and now < _report_cache['exp']:
+            return _report_cache['val'], _report_cache['body']
+
+    report = _build_report()
+    body = _dumps(report)
+    if key is not None and report.get('status') != "error":
+        with _report_cache_lock:
+            _report_cache.update(key=key, val=report, body=body, exp=now + _REPORT_TTL)
+    return report, body
+
 # New helper: Generate report from the database with enhanced diagnostics
 def generate_report():
+    """Generate report from the database (a private copy of the cached report)."""
+    return copy.deepcopy(_cached_report()[0])
+
+def generate_report_json():
+    """Return the report as encoded JSON; cache hits reuse the bytes without re-encoding."""
+    return _cached_report()[1]
+
+def _build_report():
     """Generate report from the database with enhanced diagnostics."""
     report = {}
     
@@ -32,7 +211,7 @@ def generate_report():
             report['status'] = "error"
             return report
             
-        with sqlite3.connect(config.DATABASE_FILE) as conn:
+        with _get_conn() as conn:
             # Test if tables exist
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='emails'")
@@ -41,9 +220,17 @@ def generate_report():
                 report['status'] = "error"
                 return report
                 
-            # Get email counts
-            cursor.execute("SELECT COUNT(*) FROM emails")
-            count_emails = cursor.fetchone()[0]
+            # Get email counts from the trigger-maintained stats table, falling
+            # back to a full scan for databases created before it existed
+            try:
+                cursor.execute("SELECT cnt FROM emails_stats WHERE name = 'emails'")
+                row = cursor.fetchone()
+            except sqlite3.OperationalError:
+                row = None
+            if row is None:
+                cursor.execute("SELECT COUNT(*) FROM emails")
+                row = cursor.fetchone()
+            count_emails = row[0]
             report['emails_count'] = count_emails
             
             # Get thread counts if table exists
@@ -89,65 +276,600 @@ def generate_report():
         
     return report
 
-# New helper: Execute a SQL query with better error handling
-def run_query(sql_query):
-    """Execute a SQL query with better error handling."""
-    results = []
+# Data tables, leaving out SQLite internals, the full-text index with its shadow tables
+# and the trigger-maintained counters
+_USER_TABLES_SQL = ("SELECT name FROM sqlite_master WHERE type='table' "
+                    "AND name NOT GLOB 'sqlite_*' AND name NOT GLOB 'emails_fts*' "
+                    "AND name != 'emails_stats'")
+
+def _report_tables(conn, report_type):
+    """Return the tables a report covers: the named one, or all data tables for 'full'."""
+    if report_type in ('emails', 'images', 'documents'):
+        return [report_type]
+    return [row[0] for row in conn.execute(_USER_TABLES_SQL)]
+
+# New helper: Export report tables to CSV without loading them into memory
+def write_csv_report(conn, report_type, filepath):
+    """
+    Stream one report table, or every table for a full report, into a CSV file.
     
+    Rows go from the SQLite cursor to csv.writer one at a time. A full report
+    uses the union of all tables' columns as its header, leaving cells empty
+    where a table lacks a column.
+    """
+    tables = _report_tables(conn, report_type)
+    
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        if len(tables) == 1:
+            cursor = conn.execute(f"SELECT * FROM {tables[0]}")
+            writer = csv.writer(f)
+            writer.writerow([col[0] for col in cursor.description])
+            writer.writerows(cursor)
+            return
+        
+        table_columns = {}
+        for table_name in tables:
+            cursor = conn.execute(f'SELECT * FROM "{table_name}" LIMIT 0')
+            table_columns[table_name] = [col[0] for col in cursor.description]
+        header = list(dict.fromkeys(col for cols in table_columns.values() for col in cols))
+        
+        writer = csv.DictWriter(f, fieldnames=header)
+        writer.writeheader()
+        for table_name, cols in table_columns.items():
+            cursor = conn.execute(f'SELECT * FROM "{table_name}"')
+            writer.writerows(dict(zip(cols, row)) for row in cursor)
+
+# Rows fetched per cursor batch when writing XLSX and JSON exports
+_EXPORT_BATCH = 10000
+
+# New helper: Export report tables to XLSX without loading them into memory
+def write_xlsx_report(conn, report_type, filepath):
+    """
+    Write one worksheet per report table using xlsxwriter's constant_memory mode.
+    
+    Rows are fetched in _EXPORT_BATCH batches and written as they arrive, so
+    memory use does not grow with table size.
+    """
+    import xlsxwriter
+    
+    with xlsxwriter.Workbook(filepath, {'constant_memory': True}) as workbook:
+        for table_name in _report_tables(conn, report_type):
+            worksheet = workbook.add_worksheet(table_name[:31])  # Excel sheet name length limit
+            cursor = conn.execute(f'SELECT * FROM "{table_name}"')
+            cursor.arraysize = _EXPORT_BATCH
+            worksheet.write_row(0, 0, [col[0] for col in cursor.description])
+            row_num = 1
+            rows = cursor.fetchmany()
+            while rows:
+                for row in rows:
+                    worksheet.write_row(row_num, 0, row)
+                    row_num += 1
+                rows = cursor.fetchmany()
+
+# New helper: Export report tables to JSON without loading them into memory
+def write_json_report(conn, report_type, filepath):
+    """
+    Stream report rows into a JSON file as records, one fetched batch at a time.
+    
+    A single-table report is a list of records; a full report is an object
+    mapping each table name to its list of records.
+    """
+    tables = _report_tables(conn, report_type)
+    single = report_type in ('emails', 'images', 'documents')
+    
+    with open(filepath, 'wb') as f:
+        if not single:
+            f.write(b'{')
+        for i, table_name in enumerate(tables):
+            if not single:
+                f.write((b',' if i else b'') + _dumps(table_name) + b':')
+            cursor = conn.execute(f'SELECT * FROM "{table_name}"')
+            cursor.arraysize = _EXPORT_BATCH
+            columns = [desc[0] for desc in cursor.description]
+            f.write(b'[')
+            first = True
+            rows = cursor.fetchmany()
+            while rows:
+                chunk = _dumps([dict(zip(columns, row)) for row in rows])[1:-1]
+                f.write(chunk if first else b',' + chunk)
+                first = False
+                rows = cursor.fetchmany()
+            f.write(b']')
+        if not single:
+            f.write(b'}')
+
+# Rows fetched from SQLite per streamed chunk, and the cap on rows returned
+_QUERY_BATCH = 100
+_QUERY_LIMIT = 1000
+
+# Very basic SQL injection protection: one SELECT statement. Writes are already
+# refused by query_only; PRAGMA could switch that off and ATTACH reaches other files.
+_SELECT_RE = re.compile(r'^\s*select\b', re.I)
+_BANNED_RE = re.compile(r'\b(pragma|attach|detach)\b', re.I)
+
+# New helper: Execute a SQL query and stream the results as JSON
+def iter_query(sql_query):
+    """
+    Execute a SQL query and yield the JSON-encoded result in chunks.
+    
+    Results are columnar, {"columns": [...], "rows": [[...], ...]}, with a
+    "note" when truncated. Rows are fetched and encoded one batch at a time so
+    the full result set is never held in memory; errors are reported as
+    {"error": ...}, appended to the object if rows were already sent.
+    """
     if not sql_query.strip():
-        return [{"error": "Empty query provided"}]
+        yield _dumps({"error": "Empty query provided"})
+        return
         
-    try:
-        # First check if database exists
-        if not os.path.exists(config.DATABASE_FILE):
-            return [{"error": f"Database file not found at: {config.DATABASE_FILE}"}]
-            
-        # Very basic SQL injection protection
-        sql_lower = sql_query.lower().strip()
-        if not sql_lower.startswith('select'):
-            return [{"error": "Only SELECT queries are allowed"}]
-            
-        # Block potentially dangerous queries
-        for banned in ['delete', 'drop', 'insert', 'update', 'pragma', 'attach']:
-            if banned in sql_lower:
-                return [{"error": f"Query contains forbidden keyword: {banned}"}]
+    # First check if database exists
+    if not os.path.exists(config.DATABASE_FILE):
+        yield _dumps({"error": f"Database file not found at: {config.DATABASE_FILE}"})
+        return
+        
+    if not _SELECT_RE.match(sql_query):
+        yield _dumps({"error": "Only SELECT queries are allowed"})
+        return
         
-        with sqlite3.connect(config.DATABASE_FILE) as conn:
-            conn.row_factory = sqlite3.Row
+    # Block potentially dangerous queries
+    banned = _BANNED_RE.search(sql_query)
+    if banned:
+        yield _dumps({"error": f"Query contains forbidden keyword: {banned.group(1).lower()}"})
+        return
+    
+    sent = 0
+    try:
+        with _get_conn() as conn:
             cursor = conn.cursor()
+            # fetchmany() with no argument reads arraysize rows
+            cursor.arraysize = _QUERY_BATCH
             cursor.execute(sql_query)
+            rows = cursor.fetchmany()
             
-            # Limit large result sets for performance
-            raw_results = cursor.fetchmany(1000)  # Limit to 1000 rows max
-            
-            if not raw_results:
-                return [{"info": "Query executed successfully but returned no results"}]
+            if not rows:
+                yield _dumps({"info": "Query executed successfully but returned no results"})
+                return
                 
-            # Process the results
-            column_names = [desc[0] for desc in cursor.description]
-            results = []
-            
-            for row in raw_results:
-                result_dict = {}
-                for i, value in enumerate(row):
-                    column = column_names[i]
-                    result_dict[column] = value
-                results.append(result_dict)
+            # Column names go out once; each batch of row tuples is encoded as
+            # a list of arrays with its outer brackets stripped
+            columns = [desc[0] for desc in cursor.description]
+            yield b'{"columns":' + _dumps(columns) + b',"rows":['
+            while rows:
+                chunk = _dumps(rows)[1:-1]
+                yield chunk if sent == 0 else b',' + chunk
+                sent += len(rows)
+                if sent >= _QUERY_LIMIT:
+                    break
+                cursor.arraysize = min(_QUERY_BATCH, _QUERY_LIMIT - sent)
+                rows = cursor.fetchmany()
                 
             # Add a message if results were limited
-            if len(raw_results) == 1000:
-                results.append({"note": "Results limited to 1000 rows"})
-                
+            if sent == _QUERY_LIMIT:
+                yield b'],"note":' + _dumps(f"Results limited to {_QUERY_LIMIT} rows") + b'}'
+            else:
+                yield b']}'
+            
     except Exception as e:
-        results = [{"error": str(e)}]
+        if sent:
+            # Already mid-object: close the rows array and attach the error
+            yield b'],"error":' + _dumps(str(e)) + b'}'
+        else:
+            yield _dumps({"error": str(e)})
+
+# New helper: List the tables in the database
+def list_tables():
+    """Return the names of all tables in the database."""
+    with _get_conn() as conn:
+        return [row[0] for row in conn.execute(_USER_TABLES_SQL)]
+
+# Report export formats accepted by export_report
+_EXPORT_FORMATS = ('csv', 'xlsx', 'json')
+
+# New helper: Export database tables to a downloadable file
+def export_report(report_type, format_type):
+    """
+    Export one report table, or every table for a full report, to a file in
+    a new temporary directory.
+    
+    Args:
+        report_type: 'emails', 'images', 'documents' or 'full'
+        format_type: One of _EXPORT_FORMATS
+    
+    Returns:
+        str: Path of the written file
+    
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if format_type not in _EXPORT_FORMATS:
+        raise ValueError("Unsupported format")
+    
+    # Only needed for exports, so kept out of module import
+    import tempfile
+    from datetime import datetime
+    
+    # Create temporary file
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"database_report_{timestamp}.{format_type}"
+    # Each export gets its own directory, so concurrent exports never share a file
+    filepath = os.path.join(tempfile.mkdtemp(prefix="stone_export_"), filename)
+    
+    # Every format is written straight from the cursor without building a DataFrame
+    writer = {'csv': write_csv_report, 'xlsx': write_xlsx_report, 'json': write_json_report}[format_type]
+    try:
+        with _get_conn() as conn:
+            writer(conn, report_type, filepath)
+    except BaseException:
+        # Do not leave the partial file and its directory behind
+        _remove_export(filepath)
+        raise
+    return filepath
+
+# Declared types containing any of these get TEXT affinity in SQLite
+_TEXT_TYPE_MARKERS = ('CHAR', 'CLOB', 'TEXT')
+
+# Per-table search statements, valid for one schema version: table -> SQL, or None if missing
+_search_sql_cache = {'version': None, 'sql': {}}
+_search_sql_lock = threading.Lock()
+
+def _table_search_sql(conn, tables):
+    """
+    Return the cached search statement for each table, None for tables that do not exist.
+    
+    Statements are rebuilt only after the schema version changes (any DDL).
+    """
+    version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    with _search_sql_lock:
+        if _search_sql_cache['version'] != version:
+            _search_sql_cache['version'] = version
+            _search_sql_cache['sql'] = {}
+        cached = _search_sql_cache['sql']
+        missing = [table for table in dict.fromkeys(tables) if table not in cached]
+    
+    if missing:
+        # Get the columns of every uncached table in one query. Only columns with
+        # text affinity (or no declared type) are searched: numeric and BLOB
+        # columns would be cast to text for every row and rarely match.
+        columns = {}
+        placeholders = ",".join("?" * len(missing))
+        for table, column, col_type in conn.execute(
+                "SELECT m.name, p.name, upper(p.type) FROM sqlite_master m, pragma_table_info(m.name) p "
+                f"WHERE m.type='table' AND m.name IN ({placeholders}) ORDER BY m.name, p.cid", missing):
+            text_columns = columns.setdefault(table, [])
+            if not col_type or any(marker in col_type for marker in _TEXT_TYPE_MARKERS):
+                text_columns.append(column)
         
+        built = {}
+        for table in missing:
+            if table not in columns:
+                built[table] = None
+            elif not columns[table]:
+                built[table] = f'SELECT * FROM "{table}" LIMIT 0'
+            else:
+                search_conditions = " OR ".join(f'"{col}" LIKE :term' for col in columns[table])
+                built[table] = f'SELECT * FROM "{table}" WHERE {search_conditions} LIMIT 1000'
+        with _search_sql_lock:
+            if _search_sql_cache['version'] == version:
+                _search_sql_cache['sql'].update(built)
+        cached = {**cached, **built}
+    
+    return {table: cached[table] for table in tables}
+
+# Last export file per (report type, format), as (ETag, path)
+_export_cache = {}
+_export_cache_lock = threading.Lock()
+
+def _remove_export(filepath):
+    """Delete an export file and its private directory; open handles stay readable."""
+    with suppress(OSError):
+        os.remove(filepath)
+    with suppress(OSError):
+        os.rmdir(os.path.dirname(filepath))
+
+# Encoded GET /api/search responses and their expiry time by ETag; entries for
+# older database states age out
+_SEARCH_CACHE_MAX = 512
+# Total size of the cached bodies; bodies over _SEARCH_CACHE_MAX_BODY are not
+# cached at all and only get the ETag/304 path
+_SEARCH_CACHE_MAX_BYTES = 32 * 1024 * 1024
+_SEARCH_CACHE_MAX_BODY = 256 * 1024
+# Backstop for file systems whose mtimes are too coarse to tell two quick writes apart
+_SEARCH_CACHE_TTL = 30.0
+_search_cache = OrderedDict()
+_search_cache_bytes = 0
+_search_cache_lock = threading.Lock()
+
+def _get_cached_search(etag):
+    """Return the cached search body for etag, or None if missing or expired."""
+    global _search_cache_bytes
+    with _search_cache_lock:
+        body, expires = _search_cache.get(etag, (None, 0))
+        if body is None:
+            return None
+        if time.monotonic() >= expires:
+            del _search_cache[etag]
+            _search_cache_bytes -= len(body)
+            return None
+        _search_cache.move_to_end(etag)
+        return body
+
+def _cache_search(etag, body):
+    """Cache an encoded search body, evicting the oldest entries to stay in bounds."""
+    global _search_cache_bytes
+    if len(body) > _SEARCH_CACHE_MAX_BODY:
+        return
+    with _search_cache_lock:
+        old = _search_cache.pop(etag, None)
+        if old is not None:
+            _search_cache_bytes -= len(old[0])
+        _search_cache[etag] = (body, time.monotonic() + _SEARCH_CACHE_TTL)
+        _search_cache_bytes += len(body)
+        while (len(_search_cache) > _SEARCH_CACHE_MAX
+               or _search_cache_bytes > _SEARCH_CACHE_MAX_BYTES):
+            _, (evicted, _) = _search_cache.popitem(last=False)
+            _search_cache_bytes -= len(evicted)
+
+def _state_etag(*key):
+    """Return an ETag for key at the current database state, or None if there is no database."""
+    state = _database_state()
+    if state is None:
+        return None
+    return hashlib.blake2b(repr((key, state)).encode(), digest_size=8).hexdigest()
+
+# New helper: Search every column of the given tables for a term
+def search_tables(search_term, tables):
+    """
+    Search all columns of each table for a substring.
+    
+    Returns:
+        dict: table name -> list of matching rows, or {"error": ...} for that table
+    """
+    results = {}
+    # Bound once by name and shared by every table's statement
+    params = {'term': f"%{search_term}%"}
+    
+    with _get_conn() as conn:
+        statements = _table_search_sql(conn, tables)
+        for table in tables:
+            if statements[table] is None:
+                results[table] = {"error": f"no such table: {table}"}
+                continue
+            try:
+                cursor = conn.execute(statements[table], params)
+                names = [desc[0] for desc in cursor.description]
+                results[table] = [dict(zip(names, row)) for row in cursor]
+            except sqlite3.Error as e:
+                results[table] = {"error": str(e)}
+    
     return results
 
+# Shortest term the trigram full-text index can match
+_FTS_MIN_TERM = 3
+
+# emails_fts column index used for snippets; -1 lets FTS5 pick the best-matching column
+_SNIPPET_COLUMNS = {'subject': 0, 'content': 1, 'sender': 2}
+
+# Every search returns these columns plus a "snippet" of at most 64 characters
+_SEARCH_RESULT_COLUMNS = "message_id, date, subject, sender"
+_SNIPPET_CHARS = 64
+_LIKE_RESULT_SQL = f"SELECT {_SEARCH_RESULT_COLUMNS}, substr(content, 1, {_SNIPPET_CHARS}) AS snippet FROM emails"
+
+# New helper: Check whether the full-text search index has been created
+def _has_search_index(conn):
+    """Return True once the emails_fts table exists; a positive result is cached."""
+    global _search_index_ready
+    if not _search_index_ready:
+        _search_index_ready = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='emails_fts'").fetchone() is not None
+    return _search_index_ready
+
+_search_index_ready = False
+
+# Fields with a COLLATE NOCASE index, searchable by prefix range
+_PREFIX_INDEXED = ('subject', 'sender')
+
+# LIKE folds only ASCII letters, and so does NOCASE
+_ASCII_FOLD = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+def _prefix_bounds(pattern):
+    """
+    Return NOCASE (low, high) bounds for a 'prefix%' LIKE pattern, or None if
+    the pattern is anything else.
+    """
+    prefix = pattern[:-1].translate(_ASCII_FOLD)
+    if not pattern.endswith('%') or not prefix or '%' in prefix or '_' in prefix:
+        return None
+    if prefix[-1] == '\U0010ffff':
+        return None
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+# New helper: Search emails by subject, content and/or sender
+def search_emails(keyword, field='all', limit=100):
+    """
+    Search emails for a keyword in one field ('subject', 'content', 'sender') or all of them.
+    
+    A keyword ending in '%' (e.g. 'invoice%') matches by prefix, as a range
+    seek on the NOCASE subject/sender indexes. Other keywords match anywhere,
+    through the emails_fts trigram index when available; terms shorter than
+    three characters, or databases without the index, fall back to LIKE scans.
+    
+    Every match has the same keys: message_id, date, subject, sender and a
+    short "snippet" instead of the full email. Full-text matches are ranked
+    by relevance and their snippet highlights the term; other matches show
+    the start of the content.
+    
+    Returns:
+        list: Matching emails as dictionaries
+    """
+    if field not in ('subject', 'content', 'sender'):
+        field = 'all'
+    bounds = _prefix_bounds(keyword)
+    pattern = keyword if bounds else f'%{keyword}%'
+    
+    with _get_conn() as conn:
+        if bounds and field in _PREFIX_INDEXED:
+            # The range narrows the index seek; LIKE keeps its exact semantics
+            query = (f"{_LIKE_RESULT_SQL} WHERE {field} COLLATE NOCASE >= ? "
+                     f"AND {field} COLLATE NOCASE < ? AND {field} LIKE ? LIMIT ?")
+            params = (*bounds, pattern, limit)
+        elif not bounds and len(keyword) >= _FTS_MIN_TERM and _has_search_index(conn):
+            # Quote the term as an FTS5 string so its characters are matched literally
+            match = '"' + keyword.replace('"', '""') + '"'
+            if field != 'all':
+                match = f"{field} : {match}"
+            # Return a short highlighted excerpt rather than the whole body,
+            # best (BM25) matches first. Trigram tokens are single characters
+            # wide, so a snippet of _SNIPPET_CHARS tokens is about that many characters.
+            query = ("SELECT e.message_id, e.date, e.subject, e.sender, "
+                     f"snippet(emails_fts, {_SNIPPET_COLUMNS.get(field, -1)}, '<b>', '</b>', '...', "
+                     f"{_SNIPPET_CHARS}) AS snippet "
+                     "FROM emails_fts JOIN emails e ON e.rowid = emails_fts.rowid "
+                     "WHERE emails_fts MATCH ? ORDER BY rank LIMIT ?")
+            params = (match, limit)
+        elif field != 'all':
+            query = f"{_LIKE_RESULT_SQL} WHERE {field} LIKE ? LIMIT ?"
+            params = (pattern, limit)
+        else:
+            query = f"{_LIKE_RESULT_SQL} WHERE subject LIKE ? OR content LIKE ? OR sender LIKE ? LIMIT ?"
+            params = (pattern, pattern, pattern, limit)
+        
+        # Execute search, zipping plain tuples with the column names
+        cursor = conn.execute(query, params)
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+# New helper: Single entry point for /api/search requests
+def search_database(data):
+    """
+    Run a search described by an /api/search payload (JSON body or query string).
+    
+    {"term", "tables"} searches every column of each table and returns
+    {table: rows}; {"keyword", "field", "limit"} searches emails and returns
+    {"success", "count", "results"}.
+    
+    Raises:
+        ValueError: If a table search has no term, or limit is not a number
+    """
+    if 'term' in data:
+        if not data['term']:
+            raise ValueError("No search term provided")
+        return search_tables(data['term'], data.get('tables') or ['emails'])
+    
+    results = search_emails(data.get('keyword', ''), data.get('field', 'all'), int(data.get('limit', 100)))
+    return {'success': True, 'count': len(results), 'results': results}
+
 class CustomHandler(SimpleHTTPRequestHandler):
     """Custom handler for serving the UI and API endpoints."""
     
-    # Introduce a class-level cache for static files
-    _file_cache = {}
+    # Class-level LRU cache for static files:
+    # path -> {content coding: (header block, body memoryview, open file or None)},
+    # '' being identity. The identity variant keeps its file open for os.sendfile.
+    _file_cache = OrderedDict()
+    _file_cache_lock = threading.Lock()
+    _CACHE_MAX = 256
+
+    # Send small JSON and header writes immediately instead of waiting on Nagle
+    disable_nagle_algorithm = True
+
+    # Persistent connections, so polling clients reuse one socket
+    protocol_version = "HTTP/1.1"
+
+    @classmethod
+    def _build_static_variant(cls, body, content_type, etag, encoding='', file=None):
+        """Prebuild the raw response header block for one encoding of a file."""
+        header_blob = (
+            f"{cls.protocol_version} 200 OK\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            + (f"Content-Encoding: {encoding}\r\n" if encoding else "")
+            + f"ETag: \"{etag}{'-' + encoding if encoding else ''}\"\r\n"
+            "Vary: Accept-Encoding\r\n"
+            "Cache-Control: public, max-age=3600\r\n"
+            "\r\n"
+        ).encode('latin-1')
+        return header_blob, memoryview(body), file
+
+    @classmethod
+    def _build_static_entry(cls, content, content_type, file=None):
+        """Build the identity and precompressed variants of a static file."""
+        etag = hashlib.blake2b(content, digest_size=8).hexdigest()
+        entry = {'': cls._build_static_variant(content, content_type, etag, file=file)}
+        if content_type in _COMPRESSIBLE_TYPES and content:
+            # Compression cost is paid once, when the file is cached
+            if brotli is not None:
+                compressed = brotli.compress(bytes(content), quality=11)
+                if len(compressed) < len(content):
+                    entry['br'] = cls._build_static_variant(compressed, content_type, etag, 'br')
+            compressed = gzip.compress(content, 9)
+            if len(compressed) < len(content):
+                entry['gzip'] = cls._build_static_variant(compressed, content_type, etag, 'gzip')
+        return entry
+
+    @classmethod
+    def _load_static_file(cls, file_path):
+        """
+        Build the cache entry for a static file. Its 'source' records the
+        file's identity, size and mtime so the entry is rebuilt once the
+        file changes on disk.
+        """
+        content_type = _CT.get(file_path.suffix, 'application/octet-stream')
+        f = open(file_path, 'rb', buffering=0)
+        st = os.fstat(f.fileno())
+        if st.st_size and hasattr(os, 'sendfile'):
+            # Mapped only to build the compressed variants; the identity body
+            # is sent from the open file, which closes once the entry is
+            # evicted and no in-flight response still holds it
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # The body is written from memory, so keep a private copy: a
+            # mapping would fault if the file shrank underneath it
+            with f:
+                content = f.read()
+            f = None
+        entry = cls._build_static_entry(content, content_type, f)
+        entry['source'] = (str(file_path), (st.st_ino, st.st_size, st.st_mtime_ns))
+        return entry
+
+    @staticmethod
+    def _static_source_changed(entry):
+        """Return True if the file behind a cache entry was modified, replaced or removed."""
+        source = entry.get('source')
+        if source is None:
+            return False
+        path, signature = source
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        return (st.st_ino, st.st_size, st.st_mtime_ns) != signature
+
+    def _select_variant(self, entry):
+        """Pick the best precompressed variant the client accepts."""
+        if 'br' in entry or 'gzip' in entry:
+            accepted = _accepted_encodings(self.headers.get('Accept-Encoding', ''))
+            for encoding in ('br', 'gzip'):
+                if encoding in entry and encoding in accepted:
+                    return entry[encoding]
+        return entry['']
+
+    @classmethod
+    def _cache_static_entry(cls, cache_key, entry):
+        """Store or replace a cache entry as most recently used, evicting the least recently used one if full."""
+        with cls._file_cache_lock:
+            if cache_key not in cls._file_cache and len(cls._file_cache) >= cls._CACHE_MAX:
+                cls._file_cache.popitem(last=False)
+            cls._file_cache[cache_key] = entry
+            cls._file_cache.move_to_end(cache_key)
+
+    @classmethod
+    def preload_static_files(cls, ui_dir):
+        """Populate the static file cache for every file under ui_dir, plus built-ins it lacks."""
+        for file_path in ui_dir.rglob('*'):
+            if file_path.is_file():
+                cache_key = '/' + file_path.relative_to(ui_dir).as_posix()
+                cls._cache_static_entry(cache_key, cls._load_static_file(file_path))
+        for cache_key, (content, content_type) in _BUILTIN_FILES.items():
+            if cache_key not in cls._file_cache:
+                cls._cache_static_entry(cache_key, cls._build_static_entry(content, content_type))
 
     def __init__(self, *args, metrics=None, **kwargs):
         self.metrics = metrics or {}
@@ -157,41 +879,200 @@ class CustomHandler(SimpleHTTPRequestHandler):
         # Silence the default logging to avoid cluttering the console
         return
     
-    def do_GET(self):
-        """Handle GET requests."""
-        # New endpoint for report generation
-        if self.path.startswith('/api/report'):
-            report = generate_report()
+    def _send_json(self, body, status=200, etag=None):
+        """Send an already-encoded JSON body, tagged for revalidation if etag is given."""
+        if status == 200:
+            # Headers and body go out in one write from the prebuilt prefix
+            validators = b'ETag: "%s"\r\nCache-Control: no-cache\r\n' % etag.encode() if etag else b""
+            self.wfile.write(_JSON_HEADER + validators + b"Content-Length: %d\r\n\r\n" % len(body) + body)
+            return
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_query(self, query):
+        """Stream the JSON result of a SELECT query."""
+        # HTTP/1.1 clients get a chunked body so the connection stays open;
+        # older clients read until the connection closes
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            self.wfile.write(_JSON_HEADER + b"Transfer-Encoding: chunked\r\n\r\n")
+        else:
+            self.close_connection = True
+            self.wfile.write(_JSON_HEADER + b"Connection: close\r\n\r\n")
+        with closing(iter_query(query)) as chunks:
+            for chunk in chunks:
+                if not chunked:
+                    self.wfile.write(chunk)
+                elif chunk:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+    
+    def _send_download(self, f, filename, etag=None):
+        """Send an open file as an attachment, copied to the socket by the kernel, and close it."""
+        with f:
+            size = os.fstat(f.fileno()).st_size
             self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-type', _CT.get(os.path.splitext(filename)[1], 'application/octet-stream'))
+            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+            self.send_header('Content-Length', str(size))
+            if etag:
+                # Clients must revalidate, and get a 304 while the database is unchanged
+                self.send_header('ETag', f'"{etag}"')
+                self.send_header('Cache-Control', 'no-cache')
             self.end_headers()
-            self.wfile.write(json.dumps(report).encode())
+            self.connection.sendfile(f)
+    
+    def _not_modified(self, etag):
+        """Answer 304 and return True if the client already has the response tagged etag."""
+        if not etag or f'"{etag}"' not in self.headers.get('If-None-Match', ''):
+            return False
+        self.send_response(304)
+        self.send_header('ETag', f'"{etag}"')
+        self.end_headers()
+        return True
+    
+    def _send_export(self, report_type, format_type):
+        """Send a report export, answering 304 or reusing the last file when the database is unchanged."""
+        etag = _state_etag('export', report_type, format_type)
+        if self._not_modified(etag):
+            return
+        
+        key = (report_type, format_type)
+        # Files are opened under the lock, so a superseded export can be
+        # removed as soon as it leaves the cache without breaking a send
+        f = None
+        with _export_cache_lock:
+            cached = _export_cache.get(key)
+            if etag and cached and cached[0] == etag:
+                try:
+                    f = open(cached[1], 'rb')
+                except OSError:
+                    pass  # Cleaned out of the temp directory; export again
+        if f is not None:
+            self._send_download(f, os.path.basename(cached[1]), etag)
+            return
+        
+        try:
+            filepath = export_report(report_type, format_type)
+        except ValueError as e:
+            self._send_json(_dumps({"error": str(e)}), 400)
+            return
+        except Exception as e:
+            logger.error(f"Report generation error: {e}")
+            self._send_json(_dumps({"error": str(e)}), 500)
+            return
+        
+        f = open(filepath, 'rb')
+        previous = None
+        if etag:
+            with _export_cache_lock:
+                previous = _export_cache.get(key)
+                _export_cache[key] = (etag, filepath)
+        else:
+            previous = (None, filepath)
+        if previous:
+            _remove_export(previous[1])
+        self._send_download(f, os.path.basename(filepath), etag)
+    
+    def _send_search(self, data, cache_key=None):
+        """
+        Run an /api/search request and send its result.
+        Requests with a cache_key (GET query strings) are tagged with the
+        database state: a matching If-None-Match gets a 304, and the encoded
+        result is reused from _search_cache until the database changes or
+        the entry is _SEARCH_CACHE_TTL seconds old (large results are not
+        kept, see _cache_search).
+        """
+        etag = _state_etag('search', cache_key) if cache_key is not None else None
+        if etag:
+            if self._not_modified(etag):
+                return
+            body = _get_cached_search(etag)
+            if body is not None:
+                self._send_json(body, etag=etag)
+                return
+        try:
+            payload = search_database(data)
+        except ValueError as e:
+            self._send_json(_dumps({'success': False, 'error': str(e)}), 400)
+            return
+        except Exception as e:
+            logger.exception(f"Search error: {e}")
+            self._send_json(_dumps({'success': False, 'error': str(e)}), 500)
+            return
+        body = _dumps(payload)
+        if etag:
+            _cache_search(etag, body)
+        self._send_json(body, etag=etag)
+    
+    def _read_json_body(self):
+        """Parse the JSON request body, returning {} when there is none."""
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length)) if length else {}
+        return data if isinstance(data, dict) else {}
+    
+    def do_POST(self):
+        """Handle POST requests."""
+        path = urllib.parse.urlparse(self.path).path
+        try:
+            data = self._read_json_body()
+        except ValueError:
+            self._send_json(_dumps({"error": "Invalid JSON body"}), 400)
+            return
+        
+        if path == '/api/query':
+            query = data.get('query')
+            if not query:
+                self._send_json(_dumps({"error": "No query provided"}), 400)
+                return
+            self._send_query(query)
+            return
+        
+        if path == '/api/search':
+            self._send_search(data)
+            return
+        
+        self.send_error(404, "Not found")
+    
+    def do_GET(self):
+        """Handle GET requests."""
+        parsed = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(parsed.query)
+        
+        # New endpoint for report generation; with a format it downloads an export
+        if parsed.path == '/api/report':
+            if 'format' in params:
+                self._send_export(params.get('type', ['full'])[0], params['format'][0])
+                return
+            self._send_json(generate_report_json())
             return
 
         # New endpoint for query execution (only SELECT queries allowed)
-        if self.path.startswith('/api/query'):
-            parsed = urllib.parse.urlparse(self.path)
-            params = urllib.parse.parse_qs(parsed.query)
-            query = params.get('q', [''])[0]
-            # Very basic check to allow only SELECT queries
-            if not query.lower().strip().startswith("select"):
-                result = {"error": "Only SELECT queries are allowed."}
-            else:
-                result = run_query(query)
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(result).encode())
+        if parsed.path == '/api/query':
+            self._send_query(params.get('q', [''])[0])
+            return
+
+        if parsed.path == '/api/tables':
+            try:
+                self._send_json(_dumps({"tables": list_tables()}))
+            except Exception as e:
+                self._send_json(_dumps({"error": str(e)}), 500)
+            return
+
+        if parsed.path == '/api/search':
+            data = {key: values[0] for key, values in params.items()}
+            if 'tables' in data:
+                data['tables'] = data['tables'].split(',')
+            self._send_search(data, cache_key=parsed.query)
             return
 
         if self.path == '/api/metrics':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(self.metrics).encode())
+            self._send_json(_cached_metrics_bytes(self.metrics))
             return
             
         # Serve static files from ui_static directory
@@ -199,439 +1080,75 @@ class CustomHandler(SimpleHTTPRequestHandler):
             self.path = '/index.html'
             
         try:
-            ui_dir = Path(__file__).parent / 'ui_static'
-            file_path = ui_dir / self.path.lstrip('/')
-            cache_key = str(file_path)
+            cache_key = self.path
 
-            if cache_key in CustomHandler._file_cache:
-                file_content, content_type = CustomHandler._file_cache[cache_key]
-            else:
-                if not file_path.is_file():
+            with CustomHandler._file_cache_lock:
+                cached = CustomHandler._file_cache.get(cache_key)
+                if cached is not None:
+                    CustomHandler._file_cache.move_to_end(cache_key)
+
+            if cached is not None and CustomHandler._static_source_changed(cached):
+                # Content-Length and ETag were fixed when the entry was built
+                cached = None
+
+            if cached is None:
+                # Not preloaded, evicted, added after startup or changed on disk
+                file_path = Path(__file__).parent / 'ui_static' / self.path.lstrip('/')
+                if file_path.is_file():
+                    cached = CustomHandler._load_static_file(file_path)
+                elif cache_key in _BUILTIN_FILES:
+                    cached = CustomHandler._build_static_entry(*_BUILTIN_FILES[cache_key])
+                else:
                     self.send_error(404, "File not found")
                     return
-                # Determine content type by file extension
-                if self.path.endswith('.html'):
-                    content_type = 'text/html'
-                elif self.path.endswith('.css'):
-                    content_type = 'text/css'
-                elif self.path.endswith('.js'):
-                    content_type = 'text/javascript'
-                elif self.path.endswith('.json'):
-                    content_type = 'application/json'
-                else:
-                    content_type = 'application/octet-stream'
-                with open(file_path, 'rb') as file:
-                    file_content = file.read()
-                # Cache the file content
-                CustomHandler._file_cache[cache_key] = (file_content, content_type)
+                CustomHandler._cache_static_entry(cache_key, cached)
 
-            self.send_response(200)
-            self.send_header('Content-type', content_type)
-            self.end_headers()
-            self.wfile.write(file_content)
+            header_blob, body, file = self._select_variant(cached)
+
+            # Write the prebuilt header block directly, bypassing send_header
+            self.wfile.write(header_blob)
+            if file is not None:
+                # Kernel copies file -> socket; the explicit offset leaves the
+                # shared file position alone
+                self.connection.sendfile(file, 0, len(body))
+            else:
+                self.wfile.write(body)
         except Exception as e:
             self.send_error(500, str(e))
 
+def _write_if_missing(path, content):
+    """Create a file with the given content unless it already exists.
+
+    Uses O_EXCL so the existence check and the create are a single syscall.
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, 'w') as f:
+        f.write(content)
+    return True
+
 def create_basic_ui_files():
-    """Create basic UI files if they don't exist."""
-    # Check for both "ui_static" and "UI Static" directories
-    ui_dir = Path(__file__).parent / 'ui_static'
-    alt_ui_dir = Path(__file__).parent / 'UI Static'
+    """Create the UI directory and stylesheet if missing; index.html is built in (_index_html)."""
+    parent_dir = os.path.dirname(os.path.abspath(__file__))
+    entries = {entry.name for entry in os.scandir(parent_dir)}
     
+    # Check for both "ui_static" and "UI Static" directories
     # Use whichever one exists, or create ui_static if neither exists
-    if alt_ui_dir.exists():
-        ui_dir = alt_ui_dir
+    if 'UI Static' in entries:
+        ui_dir = os.path.join(parent_dir, 'UI Static')
     else:
-        ui_dir.mkdir(exist_ok=True)
-    
-    # Create index.html if it doesn't exist
-    index_path = ui_dir / 'index.html'
-    if not index_path.exists():
-        with open(index_path, 'w') as f:
-            f.write('''<!DOCTYPE html>
-<html>
-<head>
-    <title>Stone Email & Image Processor</title>
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            margin: 0;
-            padding: 20px;
-            background-color: #f4f4f4;
-        }
-        .container {
-            width: 80%;
-            margin: auto;
-            overflow: auto;
-            padding: 20px;
-            background: #fff;
-            border-radius: 5px;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }
-        header {
-            background: #333;
-            color: white;
-            padding: 10px 20px;
-            text-align: center;
-            border-radius: 5px 5px 0 0;
-            margin-bottom: 20px;
-        }
-        h1, h2, h3 {
-            color: #333;
-        }
-        .card {
-            background: #f9f9f9;
-            padding: 15px;
-            margin-bottom: 15px;
-            border-left: 5px solid #333;
-        }
-        .warning {
-            background-color: #fff3cd;
-            border-left: 5px solid #ffc107;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-        }
-        table, th, td {
-            border: 1px solid #ddd;
-            padding: 8px;
-        }
-        th {
-            background-color: #f2f2f2;
-            text-align: left;
-        }
-        tr:nth-child(even) {
-            background-color: #f2f2f2;
-        }
-        .instructions {
-            background-color: #e7f3fe;
-            border-left: 6px solid #2196F3;
-            padding: 10px;
-            margin: 15px 0;
-        }
-        .query-section { margin-top: 20px; }
-        .query-section input[type="text"] { width: 70%; padding: 8px; }
-        .query-section button { padding: 8px 12px; }
-        .error { color: #d9534f; background-color: #f2dede; padding: 10px; border-radius: 4px; }
-        .success { color: #5cb85c; background-color: #dff0d8; padding: 10px; border-radius: 4px; }
-        pre { white-space: pre-wrap; overflow-x: auto; }
-        .results-table { margin-top: 15px; overflow-x: auto; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>Stone Email & Image Processor</h1>
-        </header>
-        
-        <div class="instructions">
-            <h3>How to Use This Tool</h3>
-            <p>To process files, place them in the input directory (default: <code>data</code> folder) and run the application.</p>
-            <p>Supported file types:</p>
-            <ul>
-                <li><strong>Emails:</strong> .mbox, .eml files</li>
-                <li><strong>Images:</strong> .jpg, .jpeg, .png files</li>
-                <li><strong>Documents:</strong> .pdf files</li>
-            </ul>
-            <p>You can specify a different input directory with the <code>--directory</code> or <code>-d</code> command-line option.</p>
-        </div>
-        
-        <div class="card">
-            <h2>Processing Summary</h2>
-            <div id="processing-summary">Loading...</div>
-        </div>
-        
-        <div id="unsupported-files-section" style="display: none;" class="card warning">
-            <h2>Unsupported Files</h2>
-            <div id="unsupported-files">Loading...</div>
-        </div>
-        
-        <div class="card">
-            <h2>Recent Processing Details</h2>
-            <div id="processing-details">Loading...</div>
-        </div>
-
-        <div id="query-section" class="query-section">
-            <h2>Run Query</h2>
-            <input type="text" id="query-input" placeholder="Enter SELECT query (e.g., SELECT * FROM emails LIMIT 10)">
-            <button onclick="runQuery()">Run Query</button>
-            <div id="query-results"></div>
-        </div>
-        
-        <div id="report-section" class="query-section">
-            <h2>Generate Report</h2>
-            <button onclick="generateReport()">Generate Report</button>
-            <div id="report-results"></div>
-        </div>
-    </div>
-    <script>
-        // Fetch processing metrics from the server
-        async function fetchMetrics() {
-            try {
-                const response = await fetch('/api/metrics');
-                const data = await response.json();
-                displayMetrics(data);
-            } catch (error) {
-                console.error('Error fetching metrics:', error);
-                document.getElementById('processing-summary').innerHTML = 
-                    '<p>Error loading metrics. Please try refreshing the page.</p>';
-            }
-        }
-        
-        function displayMetrics(metrics) {
-            // Display summary
-            let summaryHtml = '<table>';
-            
-            if (metrics.start_time) {
-                const startTime = new Date(metrics.start_time * 1000);
-                const elapsedTime = ((Date.now() / 1000) - metrics.start_time).toFixed(2);
-                summaryHtml += `<tr><td><strong>Processing Start Time</strong></td><td>${startTime.toLocaleString()}</td></tr>`;
-                summaryHtml += `<tr><td><strong>Total Processing Time</strong></td><td>${elapsedTime} seconds</td></tr>`;
-            }
-            
-            if ('processed_emails' in metrics) {
-                summaryHtml += `<tr><td><strong>Processed Emails</strong></td><td>${metrics.processed_emails}</td></tr>`;
-            }
-            
-            if ('processed_files' in metrics) {
-                summaryHtml += `<tr><td><strong>Processed Email Files</strong></td><td>${metrics.processed_files}</td></tr>`;
-            }
-            
-            if ('processed_images' in metrics) {
-                summaryHtml += `<tr><td><strong>Processed Images</strong></td><td>${metrics.processed_images}</td></tr>`;
-            }
-            
-            if ('image_files_found' in metrics) {
-                summaryHtml += `<tr><td><strong>Image Files Found</strong></td><td>${metrics.image_files_found}</td></tr>`;
-            }
-            
-            if ('processed_pdfs' in metrics) {
-                summaryHtml += `<tr><td><strong>Processed PDFs</strong></td><td>${metrics.processed_pdfs}</td></tr>`;
-            }
-            
-            if ('pdf_files_found' in metrics) {
-                summaryHtml += `<tr><td><strong>PDF Files Found</strong></td><td>${metrics.pdf_files_found}</td></tr>`;
-            }
-            
-            summaryHtml += '</table>';
-            document.getElementById('processing-summary').innerHTML = summaryHtml;
-            
-            // Display unsupported files if present
-            if (metrics.unsupported_files && metrics.unsupported_files.length > 0) {
-                document.getElementById('unsupported-files-section').style.display = 'block';
-                
-                // Group by extension
-                const byExtension = {};
-                metrics.unsupported_files.forEach(file => {
-                    const ext = file.extension || 'no extension';
-                    if (!byExtension[ext]) {
-                        byExtension[ext] = [];
-                    }
-                    byExtension[ext].push(file);
-                });
-                
-                let unsupportedHtml = `<p>Found ${metrics.unsupported_files.length} files with unsupported file types:</p>`;
-                unsupportedHtml += '<table>';
-                unsupportedHtml += '<tr><th>Extension</th><th>Count</th><th>Examples</th></tr>';
-                
-                for (const ext in byExtension) {
-                    const files = byExtension[ext];
-                    const examples = files.slice(0, 3).map(f => f.name).join(', ');
-                    const moreCount = files.length > 3 ? ` and ${files.length - 3} more` : '';
-                    
-                    unsupportedHtml += `<tr>
-                        <td>${ext}</td>
-                        <td>${files.length}</td>
-                        <td>${examples}${moreCount}</td>
-                    </tr>`;
-                }
-                
-                unsupportedHtml += '</table>';
-                unsupportedHtml += '<p>To process these files, support for these file types needs to be added to the application.</p>';
-                
-                document.getElementById('unsupported-files').innerHTML = unsupportedHtml;
-            } else {
-                document.getElementById('unsupported-files-section').style.display = 'none';
-            }
-            
-            // Display additional details if available
-            let detailsHtml = '<p>No detailed information available.</p>';
-            document.getElementById('processing-details').innerHTML = detailsHtml;
-        }
-        
-        async function generateReport() {
-            try {
-                document.getElementById('report-results').innerHTML = '<p>Loading report data...</p>';
-                const response = await fetch('/api/report');
-                const report = await response.json();
-                
-                let reportHtml = '';
-                
-                if (report.status === 'error') {
-                    reportHtml = `<div class="error"><strong>Error:</strong> ${report.error}</div>`;
-                    if (report.traceback) {
-                        reportHtml += `<pre>${report.traceback}</pre>`;
-                    }
-                } else if (report.status === 'empty') {
-                    reportHtml = `<div class="error">
-                        <p>${report.message}</p>
-                        <p>${report.help || 'Add .mbox files to your data directory and run the processor.'}</p>
-                    </div>`;
-                } else {
-                    reportHtml = `<div class="success">
-                        <h3>Database Summary</h3>
-                        <table>
-                            <tr><td>Total Emails:</td><td>${report.emails_count}</td></tr>
-                            <tr><td>Total Threads:</td><td>${report.threads_count}</td></tr>
-                        </table>`;
-                        
-                    if (report.recent_emails && report.recent_emails.length > 0) {
-                        reportHtml += `<h3>Recent Emails</h3>
-                        <table>
-                            <tr><th>Date</th><th>Sender</th><th>Subject</th></tr>`;
-                        
-                        report.recent_emails.forEach(email => {
-                            reportHtml += `<tr>
-                                <td>${email.date}</td>
-                                <td>${email.sender}</td>
-                                <td>${email.subject}</td>
-                            </tr>`;
-                        });
-                        
-                        reportHtml += `</table>`;
-                    }
-                    
-                    reportHtml += `</div>`;
-                }
-                
-                document.getElementById('report-results').innerHTML = reportHtml;
-            } catch (error) {
-                document.getElementById('report-results').innerHTML = 
-                    `<div class="error">Error generating report: ${error.message}</div>`;
-            }
-        }
-        
-        async function runQuery() {
-            const q = document.getElementById('query-input').value.trim();
-            
-            if (!q) {
-                document.getElementById('query-results').innerHTML = 
-                    `<div class="error">Please enter a SQL query</div>`;
-                return;
-            }
-            
-            try {
-                document.getElementById('query-results').innerHTML = '<p>Executing query...</p>';
-                const response = await fetch('/api/query?q=' + encodeURIComponent(q));
-                const result = await response.json();
-                
-                if (result.length === 0) {
-                    document.getElementById('query-results').innerHTML = 
-                        '<p>Query returned no results.</p>';
-                    return;
-                }
-                
-                if (result[0].error) {
-                    document.getElementById('query-results').innerHTML = 
-                        `<div class="error">Error: ${result[0].error}</div>`;
-                    return;
-                }
-                
-                if (result[0].info) {
-                    document.getElementById('query-results').innerHTML = 
-                        `<div class="info">${result[0].info}</div>`;
-                    return;
-                }
-                
-                // Display results as a table
-                let tableHtml = '<div class="results-table"><table><tr>';
-                
-                // Get all possible column names from all objects
-                const columns = new Set();
-                result.forEach(row => {
-                    if (!row.note) {  // Skip the "note" row
-                        Object.keys(row).forEach(key => columns.add(key));
-                    }
-                });
-                
-                // Create header row
-                columns.forEach(col => {
-                    tableHtml += `<th>${col}</th>`;
-                });
-                tableHtml += '</tr>';
-                
-                // Add data rows
-                result.forEach(row => {
-                    if (row.note) {
-                        // This is our note about limit, don't include in table
-                        return;
-                    }
-                    
-                    tableHtml += '<tr>';
-                    columns.forEach(col => {
-                        tableHtml += `<td>${row[col] !== undefined ? row[col] : ''}</td>`;
-                    });
-                    tableHtml += '</tr>';
-                });
-                
-                tableHtml += '</table></div>';
-                
-                // Add note if present
-                const noteRow = result.find(row => row.note);
-                if (noteRow) {
-                    tableHtml += `<p><em>${noteRow.note}</em></p>`;
-                }
-                
-                document.getElementById('query-results').innerHTML = tableHtml;
-            } catch (error) {
-                document.getElementById('query-results').innerHTML = 
-                    `<div class="error">Error running query: ${error.message}</div>`;
-            }
-        }
-        
-        // Add example queries for easy use
-        function setExampleQuery(queryType) {
-            const queryInput = document.getElementById('query-input');
-            switch(queryType) {
-                case 'allEmails':
-                    queryInput.value = "SELECT * FROM emails LIMIT 10";
-                    break;
-                case 'emailCount':
-                    queryInput.value = "SELECT COUNT(*) AS email_count FROM emails";
-                    break;
-                case 'threadCount': 
-                    queryInput.value = "SELECT thread_id, COUNT(*) AS message_count FROM emails GROUP BY thread_id ORDER BY message_count DESC LIMIT 10";
-                    break;
-                case 'senders':
-                    queryInput.value = "SELECT sender, COUNT(*) AS email_count FROM emails GROUP BY sender ORDER BY email_count DESC LIMIT 10";
-                    break;
-                case 'dateRange':
-                    queryInput.value = "SELECT date, subject, sender FROM emails ORDER BY date DESC LIMIT 20";
-                    break;
-            }
-            runQuery();
-        }
-        
-        // Initial fetch
-        fetchMetrics();
-        
-        // Refresh every 5 seconds
-        setInterval(fetchMetrics, 5000);
-    </script>
-</body>
-</html>''')
+        ui_dir = os.path.join(parent_dir, 'ui_static')
+        if 'ui_static' not in entries:
+            os.makedirs(ui_dir, exist_ok=True)
     
     # Create an empty style.css file
-    css_path = ui_dir / 'style.css'
-    if not css_path.exists():
-        with open(css_path, 'w') as f:
-            f.write('/* Additional styles can be placed here */')
+    _write_if_missing(os.path.join(ui_dir, 'style.css'), '/* Additional styles can be placed here */')
 
 def start_ui_server(metrics, logger, db_path=None):
     """
-    Start the Flask UI server.
+    Start the UI server.
     
     Args:
         metrics: Dictionary containing processing metrics
@@ -641,20 +1158,6 @@ def start_ui_server(metrics, logger, db_path=None):
     Returns:
         tuple: (server, server_thread)
     """
-    from flask import Flask, render_template, jsonify, request
-    import threading
-    import webbrowser
-    import socket
-    
-    # Create the Flask app
-    app = Flask(__name__, 
-                template_folder=os.path.join(os.path.dirname(__file__), 'templates'),
-                static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-    
-    # Fix for NameError: Make app available to other functions
-    global flask_app
-    flask_app = app
-    
     # Check for both "ui_static" and "UI Static" directories
     ui_dir = Path(__file__).parent / 'ui_static'
     alt_ui_dir = Path(__file__).parent / 'UI Static'
@@ -664,6 +1167,7 @@ def start_ui_server(metrics, logger, db_path=None):
     
     # Create UI files if they don't exist
     create_basic_ui_files()
+    CustomHandler.preload_static_files(ui_dir)
     
     # Create a handler class with metrics argument
     handler = lambda *args, **kwargs: CustomHandler(*args, metrics=metrics, **kwargs)
@@ -676,204 +1180,12 @@ def start_ui_server(metrics, logger, db_path=None):
     
     logger.info(f"UI server started at http://{config.UI_HOST}:{config.UI_PORT}")
     
-    # Add database query endpoints
-    @app.route('/api/query', methods=['POST'])
-    def query_database():
-        if not db_path:
-            return jsonify({"error": "Database path not configured"}), 500
-            
-        try:
-            query = request.json.get('query')
-            if not query:
-                return jsonify({"error": "No query provided"}), 400
-                
-            # Limit to SELECT queries for safety
-            if not query.strip().lower().startswith('select'):
-                return jsonify({"error": "Only SELECT queries are allowed"}), 403
-                
-            conn = sqlite3.connect(db_path)
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            
-            return jsonify(df.to_dict(orient='records'))
-        except Exception as e:
-            logger.error(f"Database query error: {e}")
-            return jsonify({"error": str(e)}), 500
-    
-    @app.route('/api/tables', methods=['GET'])
-    def get_tables():
-        if not db_path:
-            return jsonify({"error": "Database path not configured"}), 500
-            
-        try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            return jsonify({"tables": tables})
-        except Exception as e:
-            logger.error(f"Error fetching tables: {e}")
-            return jsonify({"error": str(e)}), 500
-    
-    @app.route('/api/report', methods=['GET'])
-    def generate_report():
-        if not db_path:
-            return jsonify({"error": "Database path not configured"}), 500
-            
-        try:
-            report_type = request.args.get('type', 'full')
-            format_type = request.args.get('format', 'csv')
-            
-            conn = sqlite3.connect(db_path)
-            
-            # Create temporary file
-            temp_dir = tempfile.gettempdir()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"database_report_{timestamp}.{format_type}"
-            filepath = os.path.join(temp_dir, filename)
-            
-            if report_type == 'emails':
-                df = pd.read_sql_query("SELECT * FROM emails", conn)
-            elif report_type == 'images':
-                df = pd.read_sql_query("SELECT * FROM images", conn)
-            elif report_type == 'documents':
-                df = pd.read_sql_query("SELECT * FROM documents", conn)
-            else:  # full report
-                tables = {}
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                
-                for table_name in [row[0] for row in cursor.fetchall()]:
-                    tables[table_name] = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-                
-                # For full report, create Excel with multiple sheets
-                if format_type == 'xlsx':
-                    with pd.ExcelWriter(filepath) as writer:
-                        for table_name, df in tables.items():
-                            df.to_excel(writer, sheet_name=table_name[:31])  # Excel sheet name length limit
-                    conn.close()
-                    return send_file(filepath, as_attachment=True, download_name=filename)
-                
-                # Default to CSV for full report
-                df = pd.concat([tables[t] for t in tables], keys=tables.keys())
-            
-            conn.close()
-            
-            # Export based on format
-            if format_type == 'csv':
-                df.to_csv(filepath, index=False)
-            elif format_type == 'xlsx':
-                df.to_excel(filepath, index=False)
-            elif format_type == 'json':
-                df.to_json(filepath, orient='records')
-            else:
-                return jsonify({"error": "Unsupported format"}), 400
-            
-            return send_file(filepath, as_attachment=True, download_name=filename)
-            
-        except Exception as e:
-            logger.error(f"Report generation error: {e}")
-            return jsonify({"error": str(e)}), 500
-    
-    # Add search endpoint
-    @app.route('/api/search', methods=['POST'])
-    def search_database():
-        if not db_path:
-            return jsonify({"error": "Database path not configured"}), 500
-            
-        try:
-            search_term = request.json.get('term')
-            tables = request.json.get('tables', ['emails'])
-            
-            if not search_term:
-                return jsonify({"error": "No search term provided"}), 400
-                
-            conn = sqlite3.connect(db_path)
-            results = {}
-            
-            for table in tables:
-                try:
-                    # Get table columns
-                    cursor = conn.cursor()
-                    cursor.execute(f"PRAGMA table_info({table})")
-                    columns = [row[1] for row in cursor.fetchall()]
-                    
-                    # Build search query for text columns
-                    search_conditions = " OR ".join([f"{col} LIKE ?" for col in columns])
-                    search_params = [f"%{search_term}%"] * len(columns)
-                    
-                    query = f"SELECT * FROM {table} WHERE {search_conditions} LIMIT 1000"
-                    df = pd.read_sql_query(query, conn, params=search_params)
-                    results[table] = df.to_dict(orient='records')
-                except Exception as e:
-                    results[table] = {"error": str(e)}
-            
-            conn.close()
-            return jsonify(results)
-            
-        except Exception as e:
-            logger.error(f"Search error: {e}")
-            return jsonify({"error": str(e)}), 500
-
-    @app.route('/api/search', methods=['GET', 'POST'])
-    def search_database():
-        """API endpoint to search the database for emails"""
-        try:
-            # Get search parameters
-            if request.method == 'POST':
-                data = request.json
-                keyword = data.get('keyword', '')
-                field = data.get('field', 'all')  # 'subject', 'content', 'sender', 'all'
-                limit = int(data.get('limit', 100))
-            else:  # GET method
-                keyword = request.args.get('keyword', '')
-                field = request.args.get('field', 'all')
-                limit = int(request.args.get('limit', 100))
-            
-            # Connect to database
-            conn = sqlite3.connect(config.DATABASE_FILE)
-            conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-            cursor = conn.cursor()
-            
-            # Build the query based on which field to search
-            if field == 'subject':
-                query = "SELECT * FROM emails WHERE subject LIKE ? LIMIT ?"
-                params = (f'%{keyword}%', limit)
-            elif field == 'content':
-                query = "SELECT * FROM emails WHERE content LIKE ? LIMIT ?"
-                params = (f'%{keyword}%', limit)
-            elif field == 'sender':
-                query = "SELECT * FROM emails WHERE sender LIKE ? LIMIT ?"
-                params = (f'%{keyword}%', limit)
-            else:  # 'all' - search all fields
-                query = "SELECT * FROM emails WHERE subject LIKE ? OR content LIKE ? OR sender LIKE ? LIMIT ?"
-                params = (f'%{keyword}%', f'%{keyword}%', f'%{keyword}%', limit)
-            
-            # Execute search
-            cursor.execute(query, params)
-            results = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
-            
-            return jsonify({
-                'success': True,
-                'count': len(results),
-                'results': results
-            })
-            
-        except Exception as e:
-            logger.exception(f"Search error: {str(e)}")
-            return jsonify({
-                'success': False,
-                'error': str(e)
-            }), 500
-
     return server, server_thread
 
 def open_ui_in_browser(logger):
     """Open the UI in the default web browser."""
+    import webbrowser
+    
     url = f"http://{config.UI_HOST}:{config.UI_PORT}"
     
     try:
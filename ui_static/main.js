@@ -24,7 +24,7 @@ function searchEmails() {
                 <h5>${email.subject || '(No subject)'}</h5>
                 <p><strong>From:</strong> ${email.sender || 'Unknown'}</p>
                 <p><strong>Date:</strong> ${email.date || 'Unknown'}</p>
-                <p class="email-preview">${email.content?.substring(0, 150) || '(No content)'}...</p>
+                <p class="email-preview">${email.snippet || '(No content)'}</p>
                 <button onclick="viewFullEmail(${email.id})">View Full Email</button>
               </div>
             `;
@@ -1,29 +1,119 @@
 import sys
 import logging
+import logging.handlers
 import os
 import time
 import hashlib
 import json
-import shutil
-import psutil
+import sqlite3
+import queue
+import atexit
+import threading
 import config
 from pathlib import Path
 from typing import List, Dict, Any
+from contextlib import closing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+# Every supported file extension, lowercased for case-insensitive comparison
+_SUPPORTED_EXTS = frozenset(
+    ext.lower() for exts in config.SUPPORTED_EXTENSIONS.values() for ext in exts
+)
+
+# Log file writes are batched through a buffer of this size
+_LOG_BUFFER_SIZE = 64 * 1024
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler that writes through a 64 KiB buffer instead of flushing
+    after every record. WARNING and above are flushed immediately; other
+    records are flushed by a background thread every flush_interval seconds
+    and when the handler is closed.
+    """
+    
+    def __init__(self, filename, mode='a', encoding=None, flush_interval=0.2,
+                 flush_level=logging.WARNING):
+        super().__init__(filename, mode, encoding)
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self._closing = threading.Event()
+        threading.Thread(target=self._flush_periodically, name="log-flush", daemon=True).start()
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=_LOG_BUFFER_SIZE, encoding=self.encoding)
+    
+    def _flush_periodically(self):
+        while not self._closing.wait(self.flush_interval):
+            self.flush()
+    
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= self.flush_level:
+                self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+    
+    def close(self):
+        self._closing.set()
+        super().close()
+
+# Background listener that owns the real log handlers (see setup_logging)
+_log_listener = None
+
+def _stop_log_listener():
+    """Drain queued log records, stop the listener thread and close its handlers."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+atexit.register(_stop_log_listener)
 
 def setup_logging() -> logging.Logger:
     """
     Sets up logging with both file and console handlers.
+    The root logger only enqueues records; a QueueListener thread formats
+    them and does the file and console writes, so logging calls never block
+    on I/O.
     """
-    # Emergency debugging - write directly to a known file before any setup
-    with open("/tmp/stone_debug.log", "w") as f:
-        f.write(f"Startup diagnostic at {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Python version: {sys.version}\n")
-        f.write(f"sys.stdout type: {type(sys.stdout)}\n")
-        f.write(f"sys.stderr type: {type(sys.stderr)}\n")
+    global _log_listener
+    # Emergency debugging (STONE_DEBUG=1) - write directly to a known file before
+    # any setup. The file is opened once and shared by every diagnostic below.
+    debug_log = None
+    if os.environ.get("STONE_DEBUG"):
+        debug_log = open("/tmp/stone_debug.log", "a", buffering=1)
+        debug_log.write(
+            f"Startup diagnostic at {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"Python version: {sys.version}\n"
+            f"sys.stdout type: {type(sys.stdout)}\n"
+            f"sys.stderr type: {type(sys.stderr)}\n"
+        )
     
     # Print directly to ensure we have basic console output
     print("Initializing logging system...")
-    print(f"sys.stdout appears to be: {type(sys.stdout)}")
+    if debug_log is not None:
+        print(f"sys.stdout appears to be: {type(sys.stdout)}")
     
     # Save original stdout/stderr
     original_stdout = sys.stdout
@@ -36,6 +126,7 @@ def setup_logging() -> logging.Logger:
     if logger.handlers:
         for handler in logger.handlers[:]:
             logger.removeHandler(handler)
+    _stop_log_listener()
 
     log_dir = os.path.dirname(config.LOG_FILE)
     if not os.path.exists(log_dir):
@@ -47,11 +138,12 @@ def setup_logging() -> logging.Logger:
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
     simple_formatter = logging.Formatter('%(message)s')  # Simpler format for console
 
+    handlers = []
     try:
-        file_handler = logging.FileHandler(config.LOG_FILE)
+        file_handler = BufferedFileHandler(config.LOG_FILE)
         file_handler.setLevel(log_level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
         print(f"Log file: {config.LOG_FILE}")  # Direct console output
     except Exception as e:
         print(f"Warning: Could not set up file logging: {e}")
@@ -61,23 +153,30 @@ def setup_logging() -> logging.Logger:
     error_console = logging.StreamHandler(sys.stderr)
     error_console.setLevel(logging.WARNING)  # WARNING and above go to stderr
     error_console.setFormatter(formatter)
-    logger.addHandler(error_console)
+    handlers.append(error_console)
 
     info_console = logging.StreamHandler(sys.stdout)
     info_console.setLevel(logging.INFO)  # INFO and DEBUG go to stdout
     info_console.setFormatter(simple_formatter)
     info_console.addFilter(lambda record: record.levelno < logging.WARNING)  # Only handle INFO and DEBUG
-    logger.addHandler(info_console)
+    handlers.append(info_console)
 
-    # Ensure we get some direct console output regardless of logging
-    try:
-        print(f"Direct print test: Starting Stone Email Processor v{config.VERSION}")
-        original_stdout.write(f"Direct stdout write test: Log level: {config.LOG_LEVEL}\n")
-        original_stdout.flush()
-    except Exception as e:
-        # If direct print fails, try writing to our emergency log
-        with open("/tmp/stone_debug.log", "a") as f:
-            f.write(f"Error during direct console output: {e}\n")
+    # Writes happen on the listener thread; each handler still applies its own level
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    # Check that direct console output works regardless of logging
+    if debug_log is not None:
+        try:
+            print(f"Direct print test: Starting Stone Email Processor v{config.VERSION}")
+            original_stdout.write(f"Direct stdout write test: Log level: {config.LOG_LEVEL}\n")
+            original_stdout.flush()
+        except Exception as e:
+            # If direct print fails, record it in our emergency log
+            debug_log.write(f"Error during direct console output: {e}\n")
+        debug_log.close()
     
     print(f"Starting Stone Email Processor v{config.VERSION}")
     print(f"Log level: {config.LOG_LEVEL}")
@@ -89,28 +188,101 @@ def setup_logging() -> logging.Logger:
 
     return logger
 
+# Read size for hashing when hashlib.file_digest is unavailable
+_HASH_CHUNK_SIZE = 1024 * 1024
+# Files at least this large are hashed with reads overlapped against hashing
+_PIPELINE_THRESHOLD = 10 * 1024 * 1024
+_PIPELINE_CHUNK_SIZE = 8 * 1024 * 1024
+_PIPELINE_DEPTH = 4
+
+def _hash_pipelined(f):
+    """
+    Hash a large file with a reader thread feeding 8 MiB chunks through a
+    bounded queue, so the next read runs while sha256 hashes the current
+    chunk (both release the GIL). The digest is the plain SHA256 of the file.
+    """
+    chunks = queue.Queue(maxsize=_PIPELINE_DEPTH)
+    
+    def reader():
+        try:
+            for chunk in iter(lambda: f.read(_PIPELINE_CHUNK_SIZE), b''):
+                chunks.put(chunk)
+            chunks.put(None)
+        except BaseException as e:
+            # Hand every failure to the consumer, which would otherwise wait forever
+            chunks.put(e)
+    
+    thread = threading.Thread(target=reader, name="hash-reader", daemon=True)
+    thread.start()
+    sha256 = hashlib.sha256()
+    while (chunk := chunks.get()) is not None:
+        if isinstance(chunk, BaseException):
+            raise chunk
+        sha256.update(chunk)
+    thread.join()
+    return sha256.hexdigest()
+
 def get_file_hash(file_path):
     """
     Calculate SHA256 hash of a file to detect changes.
-    Optimizes for large files using memory-mapped file reading.
+    Large files are read and hashed concurrently; smaller ones use
+    hashlib.file_digest (Python 3.11+), which hashes in C with the GIL
+    released, or fall back to 1 MiB reads into a reused buffer.
     """
-    sha256 = hashlib.sha256()
-    file_size = os.path.getsize(file_path)
-    threshold = 10 * 1024 * 1024  # Use mmap if file is larger than 10 MB
-    if file_size > threshold:
-        with open(file_path, 'rb') as f:
-            import mmap
-            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                sha256.update(mm)
-    else:
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                sha256.update(chunk)
+    # Unbuffered: every path reads in large blocks of its own
+    with open(file_path, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            # Whole file is read once front to back: ask for aggressive readahead
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if os.fstat(f.fileno()).st_size >= _PIPELINE_THRESHOLD:
+            return _hash_pipelined(f)
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        sha256 = hashlib.sha256()
+        buf = memoryview(bytearray(_HASH_CHUNK_SIZE))
+        while n := f.readinto(buf):
+            sha256.update(buf[:n])
     return sha256.hexdigest()
 
+# Cache digests from BLAKE3 are truncated to 128 bits (32 hex characters)
+_BLAKE3_DIGEST_SIZE = 16
+
+def _get_file_blake3(file_path):
+    """Hash a file with multithreaded, memory-mapped BLAKE3, truncated to 128 bits."""
+    hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    return hasher.update_mmap(file_path).hexdigest(length=_BLAKE3_DIGEST_SIZE)
+
+def get_file_hash_cached(file_path, cache):
+    """
+    Return a change-detection hash of a file, reusing the hash stored in
+    cache when the file's mtime and size are unchanged.
+    
+    New entries use a 128-bit BLAKE3 digest when blake3 is installed.
+    Existing entries keep the algorithm they were stored with (told apart
+    by digest length), so their hashes stay comparable.
+    
+    Cache entries are {"hash", "mtime_ns", "size"} dicts; entries from older
+    caches (a bare hash string) are re-hashed once and upgraded in place.
+    """
+    st = os.stat(file_path)
+    entry = cache.get(file_path)
+    if (isinstance(entry, dict) and entry.get("mtime_ns") == st.st_mtime_ns
+            and entry.get("size") == st.st_size):
+        return entry["hash"]
+    
+    previous = entry["hash"] if isinstance(entry, dict) else entry
+    if blake3 is not None and (previous is None or len(previous) == 2 * _BLAKE3_DIGEST_SIZE):
+        file_hash = _get_file_blake3(file_path)
+    else:
+        file_hash = get_file_hash(file_path)
+    cache[file_path] = {"hash": file_hash, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    return file_hash
+
 def backup_database(logger):
     """
     Create a backup of the database file.
+    Uses SQLite's online backup API, which reads a consistent snapshot
+    (including changes still in the WAL file) without blocking writers.
     """
     if not os.path.exists(config.DATABASE_FILE):
         logger.warning("No database file exists to backup")
@@ -118,7 +290,9 @@ def backup_database(logger):
         
     backup_path = f"{config.DATABASE_FILE}.{int(time.time())}.bak"
     try:
-        shutil.copy2(config.DATABASE_FILE, backup_path)
+        with closing(sqlite3.connect(config.DATABASE_FILE)) as src, \
+                closing(sqlite3.connect(backup_path)) as dst:
+            src.backup(dst)
         logger.info(f"Database backup created at {backup_path}")
         return True
     except Exception as e:
@@ -129,29 +303,65 @@ def check_memory_usage(max_percentage, logger):
     """
     Check if memory usage is below the specified threshold.
     """
+    # Imported here so modules that only need the other helpers don't load psutil
+    import psutil
+    
     usage = psutil.virtual_memory().percent
     if usage > max_percentage:
-        logger.warning(f"Memory usage at {usage}% exceeds threshold of {max_percentage}%")
+        logger.warning("Memory usage at %s%% exceeds threshold of %s%%", usage, max_percentage)
         return False
     return True
 
+def _cache_paths():
+    """Return the (msgpack, JSON) locations of the processed-files cache."""
+    cache_dir = Path(os.path.dirname(config.DATABASE_FILE))
+    return cache_dir / "processed_files.msgpack", cache_dir / "processed_files.json"
+
+def _pack_file_cache(cache_data):
+    """
+    Encode the cache as msgpack, storing each digest as raw bytes instead of
+    hex: 32 bytes for SHA256 entries, 16 for truncated BLAKE3 ones.
+    """
+    packed = {}
+    for path, entry in cache_data.items():
+        if isinstance(entry, dict):
+            packed[path] = [bytes.fromhex(entry["hash"]), entry["mtime_ns"], entry["size"]]
+        else:
+            packed[path] = bytes.fromhex(entry)
+    return msgpack.packb(packed, use_bin_type=True)
+
+def _unpack_file_cache(data):
+    """Decode a msgpack cache back into hex-digest entries."""
+    cache = {}
+    for path, entry in msgpack.unpackb(data, raw=False).items():
+        if isinstance(entry, list):
+            digest, mtime_ns, size = entry
+            cache[path] = {"hash": digest.hex(), "mtime_ns": mtime_ns, "size": size}
+        else:
+            cache[path] = entry.hex()
+    return cache
+
 def load_file_cache():
     """
-    Load the cache of processed files and their hashes.
-    Uses a more memory-efficient approach for large caches.
+    Load the cache of processed files, keyed by path with
+    {"hash", "mtime_ns", "size"} entries (see get_file_hash_cached).
+    The cache is stored as msgpack when available; an existing JSON cache
+    is read instead if no msgpack one exists yet, and is migrated on the
+    next save.
     """
-    cache_path = Path(os.path.dirname(config.DATABASE_FILE)) / "processed_files.json"
+    msgpack_path, json_path = _cache_paths()
     
-    if not cache_path.exists():
-        return {}
-        
     try:
-        # Use 'r' mode with explicit encoding for better compatibility
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
+        if msgpack is not None and msgpack_path.exists():
+            return _unpack_file_cache(msgpack_path.read_bytes())
+        if not json_path.exists():
+            return {}
+        # Read the whole file in one call and parse it with orjson when available
+        data = json_path.read_bytes()
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    except (json.JSONDecodeError, ValueError):
         logger = logging.getLogger(__name__)
-        logger.warning(f"Invalid JSON in cache file {cache_path}, rebuilding cache")
+        logger.warning("Invalid cache file, rebuilding cache")
         return {}
     except Exception as e:
         logger = logging.getLogger(__name__)
@@ -163,19 +373,32 @@ def save_file_cache(cache_data):
     Save the cache of processed files and their hashes.
     Implements safe writing to prevent corruption.
     """
-    cache_path = Path(os.path.dirname(config.DATABASE_FILE)) / "processed_files.json"
+    msgpack_path, json_path = _cache_paths()
+    cache_path = msgpack_path if msgpack is not None else json_path
     temp_path = cache_path.with_suffix('.tmp')
     
     try:
-        # First write to a temporary file
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, indent=2)
+        # First write to a temporary file, encoded in one pass and written in one call
+        if msgpack is not None:
+            data = _pack_file_cache(cache_data)
+        elif orjson is not None:
+            data = orjson.dumps(cache_data, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(cache_data, indent=2).encode('utf-8')
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            # Make the data durable before the rename can expose it
+            os.fsync(f.fileno())
             
         # Then rename it to the actual file (atomic operation on most systems)
         temp_path.replace(cache_path)
+        if cache_path is msgpack_path and json_path.exists():
+            # Migrated: drop the JSON cache so a stale copy is never read back
+            json_path.unlink()
         
         logger = logging.getLogger(__name__)
-        logger.debug(f"Cache saved with {len(cache_data)} entries")
+        logger.debug("Cache saved with %d entries", len(cache_data))
         return True
     except Exception as e:
         logger = logging.getLogger(__name__)
@@ -195,21 +418,20 @@ def display_statistics(logger, metrics, detailed=False):
     processed_files = metrics.get("processed_files", 0)
     processed_emails = metrics.get("processed_emails", 0)
     
-    # Direct console output for critical information
-    print("\n" + "=" * 50)
-    print("PROCESSING SUMMARY")
-    print("=" * 50)
-    print(f"Total time: {elapsed_time:.2f} seconds")
-    print(f"Files processed: {processed_files}")
-    print(f"Emails processed: {processed_emails}")
-    
-    # Basic summary that's always shown
-    logger.info("=" * 50)
-    logger.info("PROCESSING SUMMARY")
-    logger.info("=" * 50)
-    logger.info(f"Total time: {elapsed_time:.2f} seconds")
-    logger.info(f"Files processed: {processed_files}")
-    logger.info(f"Emails processed: {processed_emails}")
+    # Each line is formatted once, then printed and logged as separate blocks
+    summary = (
+        "=" * 50,
+        "PROCESSING SUMMARY",
+        "=" * 50,
+        f"Total time: {elapsed_time:.2f} seconds",
+        f"Files processed: {processed_files}",
+        f"Emails processed: {processed_emails}",
+    )
+    print()
+    for line in summary:
+        print(line)
+    for line in summary:
+        logger.info(line)
     
     # Show warnings if any
     if "warning" in metrics:
@@ -225,12 +447,12 @@ def display_statistics(logger, metrics, detailed=False):
     
     # Show minimal UI access information
     ui_msg = f"For detailed statistics and visualization, visit the UI at: http://localhost:{config.UI_PORT}"
-    print("\n" + "-" * 50)
-    print(ui_msg)
-    print("Press Ctrl+C to exit the server when done.")
-    logger.info("-" * 50)
-    logger.info(ui_msg)
-    logger.info("Press Ctrl+C to exit the server when done.")
+    ui_lines = ("-" * 50, ui_msg, "Press Ctrl+C to exit the server when done.")
+    print()
+    for line in ui_lines:
+        print(line)
+    for line in ui_lines:
+        logger.info(line)
     
     # Only show detailed stats if specifically requested
     if detailed:
@@ -239,15 +461,17 @@ def display_statistics(logger, metrics, detailed=False):
         logger.info("DETAILED STATISTICS:")
         
         # List all metrics except internal ones
-        for key, value in sorted(metrics.items()):
-            if key not in ["start_time", "warning", "unsupported_files"]:
-                print(f"  {key}: {value}")
-                logger.info(f"  {key}: {value}")
+        lines = [f"  {key}: {value}" for key, value in sorted(metrics.items())
+                 if key not in ["start_time", "warning", "unsupported_files"]]
         
         # Show unsupported file count if available
         if "unsupported_files" in metrics and metrics["unsupported_files"]:
-            print(f"  Unsupported files: {len(metrics['unsupported_files'])}")
-            logger.info(f"  Unsupported files: {len(metrics['unsupported_files'])}")
+            lines.append(f"  Unsupported files: {len(metrics['unsupported_files'])}")
+        
+        for line in lines:
+            print(line)
+        for line in lines:
+            logger.info(line)
 
 def ensure_data_directory(directory_path: Path) -> None:
     """
@@ -291,29 +515,22 @@ def identify_unsupported_files(directory_path: str, logger: logging.Logger) -> L
     Returns:
         List of dictionaries with information about unsupported files
     """
-    # Gather all supported extensions from config
-    all_supported_exts = []
-    for category, exts in config.SUPPORTED_EXTENSIONS.items():
-        all_supported_exts.extend(exts)
-    
-    # Make sure all extensions are lowercase for case-insensitive comparison
-    all_supported_exts = [ext.lower() for ext in all_supported_exts]
-    
     unsupported_files = []
-    directory = Path(directory_path)
     
-    # Get all files in directory (excluding directories)
+    # Get all files in directory (excluding directories); scandir entries
+    # reuse the file type and stat results from the directory listing
     try:
-        for file_path in directory.iterdir():
-            if file_path.is_file() and file_path.name != "README.txt":
-                ext = file_path.suffix.lower()
-                if ext not in all_supported_exts:
-                    unsupported_files.append({
-                        "name": file_path.name,
-                        "path": str(file_path),
-                        "extension": ext,
-                        "size": file_path.stat().st_size
-                    })
+        with os.scandir(directory_path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name != "README.txt":
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    if ext not in _SUPPORTED_EXTS:
+                        unsupported_files.append({
+                            "name": entry.name,
+                            "path": entry.path,
+                            "extension": ext,
+                            "size": entry.stat().st_size
+                        })
     except Exception as e:
         logger.error(f"Error scanning directory for unsupported files: {e}")
     